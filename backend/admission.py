@@ -0,0 +1,254 @@
+"""Per-client rate limiting and admission control for expensive routes.
+
+ClientRateLimiter keeps a token bucket per client in a pluggable store: MemoryBucketStore
+for a single process, or SQLiteBucketStore to share buckets between the workers on a host
+at the cost of a write transaction, on an executor thread, per request.
+AdmissionController caps how many requests run at once and how many may wait for a slot,
+so a burst gets a fast 429 instead of piling up behind the LLM and email providers.
+"""
+import asyncio
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_connections import ThreadLocalConnections
+
+logger = logging.getLogger(__name__)
+
+
+def refill_and_take(tokens, elapsed, rate, burst, cost):
+    """Return (tokens left, seconds until `cost` is available; 0 when it was taken)"""
+    tokens = min(burst, tokens + elapsed * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets in this process, forgetting the least recently seen clients past `max_keys`"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (burst, now))
+            tokens, wait = refill_and_take(tokens, now - updated_at, rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    async def atake(self, key, rate, burst, cost=1.0):
+        # Never blocks for long, so it runs on the event loop
+        return self.take(key, rate, burst, cost)
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, so every worker on the host enforces the same limits.
+
+    Each take is one short write transaction, run on an executor thread by `atake`. If the
+    database stays locked past `timeout`, the request is let through rather than held up.
+    """
+
+    def __init__(self, database_path=".rate_limits.db", timeout=0.05, prune_every=1000, idle_ttl=3600):
+        self.database_path = database_path
+        self.timeout = timeout
+        self.prune_every = prune_every
+        self.idle_ttl = idle_ttl
+        self._connections = ThreadLocalConnections(database_path, timeout=timeout, isolation_level=None)
+        self._takes = 0
+        self._lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        return self._connections.get()
+
+    def take(self, key, rate, burst, cost=1.0):
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated_at = row if row else (burst, now)
+                tokens, wait = refill_and_take(tokens, max(0.0, now - updated_at), rate, burst, cost)
+                conn.execute(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (key, tokens, now)
+                )
+                with self._lock:
+                    self._takes += 1
+                    should_prune = self._takes % self.prune_every == 0
+                if should_prune:
+                    # Buckets idle this long have refilled, so dropping them changes nothing
+                    conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - self.idle_ttl,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return 0.0
+        return wait
+
+    async def atake(self, key, rate, burst, cost=1.0):
+        return await asyncio.get_running_loop().run_in_executor(None, self.take, key, rate, burst, cost)
+
+
+class ClientRateLimiter:
+    """Token bucket per client: `rate` requests per second sustained, bursts of up to `burst`"""
+
+    def __init__(self, store, rate, burst):
+        self.store = store
+        self.rate = rate
+        self.burst = max(1.0, burst)
+
+    async def check(self, key, cost=1.0):
+        """Seconds the client must wait before retrying, or 0 if the request may proceed"""
+        if self.rate <= 0:
+            return 0.0
+        return await self.store.atake(key, self.rate, self.burst, cost)
+
+
+def client_key(scope, trusted_proxies=0):
+    """The address to rate limit an ASGI request by.
+
+    That's the connecting address unless `trusted_proxies` is set. Behind that many proxies
+    appending to X-Forwarded-For, the entry that many places from the right is the client;
+    anything to its left was sent by the client and can be forged.
+    """
+    if trusted_proxies > 0:
+        forwarded = []
+        for name, value in scope.get("headers") or []:
+            if name == b"x-forwarded-for":
+                forwarded.extend(part.strip() for part in value.decode("latin-1").split(","))
+        forwarded = [part for part in forwarded if part]
+        if forwarded:
+            # With fewer entries than proxies, every entry was still added by one of ours
+            return forwarded[-min(trusted_proxies, len(forwarded))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def rejection_payload(reason):
+    return {"error": "Too many requests, please retry later", "reason": reason}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Lets `max_active` requests run at once and up to `max_queued` wait for a slot.
+
+    Anything beyond that, or anything that waits longer than `queue_timeout`, is
+    rejected. `max_active` of 0 disables admission control.
+    """
+
+    def __init__(self, max_active=16, max_queued=32, queue_timeout=5.0):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self._slots = None
+
+    async def acquire(self):
+        if self.max_active <= 0:
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_active)
+
+        if self._slots.locked():
+            if self.queued >= self.max_queued:
+                raise AdmissionRejected("queue_full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected("queue_timeout")
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+
+    def release(self):
+        if self.max_active <= 0:
+            return
+        self.active -= 1
+        self._slots.release()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying a ClientRateLimiter and an AdmissionController to `paths`.
+
+    Written against raw ASGI rather than BaseHTTPMiddleware so the admission slot is held
+    until a streamed response has finished, not just until its headers are sent.
+    `on_reject(reason, path)` is called for every rejected request. Routes in `handler_charged`
+    still go through admission control, but their handlers charge the limiter themselves, only
+    for requests that do the expensive work.
+    """
+
+    def __init__(self, app, paths, limiter, admission, trusted_proxies=0, on_reject=None, handler_charged=()):
+        self.app = app
+        self.paths = set(paths)
+        self.handler_charged = set(handler_charged)
+        self.limiter = limiter
+        self.admission = admission
+        self.trusted_proxies = trusted_proxies
+        self.on_reject = on_reject
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] not in self.handler_charged:
+            retry_after = await self.limiter.check(client_key(scope, self.trusted_proxies))
+            if retry_after:
+                await self._reject(send, scope["path"], "rate_limited", retry_after)
+                return
+
+        try:
+            await self.admission.acquire()
+        except AdmissionRejected as e:
+            await self._reject(send, scope["path"], e.reason, 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
+
+    async def _reject(self, send, path, reason, retry_after):
+        if self.on_reject:
+            self.on_reject(reason, path)
+        body = json.dumps(rejection_payload(reason)).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(math.ceil(retry_after)).encode("latin-1"))
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
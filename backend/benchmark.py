@@ -0,0 +1,217 @@
+"""Offline benchmark for the backend.
+
+Starts FakeUpstreams for Eventbrite, Yahoo Finance, OpenAI and LinkedIn, points the app
+at them, uses the fake email provider in place of Resend, and measures:
+
+  * update_cache wall time (cold and warm) and peak Python memory
+  * throughput and p50/p99 latency for the main endpoints
+
+Results are printed as JSON (and written to --output if given) so runs can be diffed.
+
+    python benchmark.py --events 200 --latency-ms 50 --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import httpx
+
+from fake_upstreams import FakeUpstreams
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies, errors, wall):
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": round(statistics.mean(ms), 3) if ms else None,
+        "p50_ms": round(percentile(ms, 50), 3) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 3) if ms else None,
+        "max_ms": round(max(ms), 3) if ms else None
+    }
+
+
+async def bench_endpoint(client, method, path, requests, concurrency, body=None):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code == 200 and "error" not in response.json()
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize_latencies(latencies, errors, time.perf_counter() - started)
+
+
+def reset_refresh_state(main):
+    """Forget everything a previous refresh left behind so the next one runs cold"""
+    main.event_validators.clear()
+    main.event_insights_cache.clear()
+    main.chunk_summary_cache.clear()
+    main.summary_cache.update(hash=None, data=None, expires_at=0.0)
+    if main.llm_cache is not None:
+        main.llm_cache.clear()
+    for entry in main.cached_data.values():
+        entry.update(data=None, last_updated=None, body=None, etag=None)
+
+
+async def bench_refresh(main):
+    results = {}
+
+    started = time.perf_counter()
+    await main.update_cache()
+    results["cold_wall_s"] = round(time.perf_counter() - started, 4)
+    results["events"] = len((main.cached_data["event_data"]["data"] or {}).get("events") or [])
+
+    started = time.perf_counter()
+    await main.update_cache()
+    results["warm_wall_s"] = round(time.perf_counter() - started, 4)
+
+    # Memory is measured on a separate cold run, since tracemalloc slows everything down
+    reset_refresh_state(main)
+    tracemalloc.start()
+    await main.update_cache()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["cold_peak_python_mb"] = round(peak / 1024 / 1024, 3)
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3)
+    return results
+
+
+async def run(args):
+    upstreams = FakeUpstreams(
+        events=args.events,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        failure_rate=args.failure_rate,
+        token_delay=args.token_delay_ms / 1000
+    )
+    url = await upstreams.start()
+    workdir = tempfile.mkdtemp(prefix="replance-bench-")
+
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_API_BASE": f"{url}/v1",
+        "OPENAI_BASE_URL": f"{url}/v1",
+        "EVENTBRITE_URL": url,
+        "YAHOO_FINANCE_URL": url,
+        "LINKEDIN_API_URL": url,
+        "EMAIL_PROVIDER": "fake",
+        "EVENT_MAX_EVENTS": str(args.events),
+        "EVENT_LISTING_PAGES": str(max(1, -(-args.events // 20))),
+        "EVENT_HOST_RATE": str(args.host_rate),
+        "EMAIL_SEND_RATE": str(args.email_send_rate),
+        "PARSER_PROCESSES": str(args.parser_processes),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db"),
+        "SNAPSHOT_PATH": os.path.join(workdir, "snapshot.json.gz"),
+        "LEADER_LOCK_PATH": os.path.join(workdir, "leader.lock"),
+        "LOG_PAYLOAD_SAMPLE_RATE": "0",
+        # Every benchmark request comes from one client, so per-client limits would reject most of them
+        "RATE_LIMIT_PER_MINUTE": "0"
+    })
+    import main
+    from email_providers import FakeEmailProvider
+
+    main.email_provider = FakeEmailProvider(latency=args.email_latency_ms / 1000)
+    await main.http_client.start()
+    main.email_jobs.start()
+    # Startup builds the LLM client in the background; do it up front so it isn't timed
+    main.warm_llm()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "update_cache": await bench_refresh(main)
+    }
+
+    email = {
+        "name": "Bench User",
+        "email": "bench@example.com",
+        "hobbies": "coding, reading, hiking",
+        "artist": "Van Gogh",
+        "movie": "The Matrix"
+    }
+    endpoints = [
+        ("GET", "/api/events", None),
+        ("GET", "/api/stock-data", None),
+        ("GET", "/api/events-summary", None),
+        ("POST", "/api/send-email", email)
+    ]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results["endpoints"] = {}
+        for method, path, body in endpoints:
+            results["endpoints"][f"{method} {path}"] = await bench_endpoint(
+                client, method, path, args.requests, args.concurrency, body
+            )
+
+    results["upstream_requests"] = upstreams.requests
+
+    await main.email_jobs.stop()
+    await main.http_client.close()
+    if main.parser_pool is not None:
+        main.parser_pool.shutdown()
+    await upstreams.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50, help="events served by the fake Eventbrite")
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency added to every upstream response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra latency, up to this much")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of upstream requests answered with 503")
+    parser.add_argument("--token-delay-ms", type=float, default=0, help="delay between streamed LLM tokens")
+    parser.add_argument("--email-latency-ms", type=float, default=20, help="latency of each fake email provider call")
+    parser.add_argument("--host-rate", type=float, default=0, help="EVENT_HOST_RATE for the crawl (0 disables it)")
+    parser.add_argument("--email-send-rate", type=float, default=0, help="EMAIL_SEND_RATE for delivery (0 disables it)")
+    parser.add_argument("--parser-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients per endpoint")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    # Configured before main is imported, so its INFO-level basicConfig becomes a no-op
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
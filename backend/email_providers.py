@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class ResendProvider:
+    """Delivers through Resend's batch API (up to 100 emails per call)"""
+
+    max_batch_size = 100
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv('RESEND_API_KEY')
+        self._resend = None
+
+    @property
+    def resend(self):
+        # The SDK is slow to import, so load it with the first send rather than at startup
+        if self._resend is None:
+            import resend
+            resend.api_key = self.api_key
+            self._resend = resend
+        return self._resend
+
+    async def send_batch(self, messages):
+        # The Resend SDK is synchronous, keep it off the event loop
+        response = await asyncio.get_event_loop().run_in_executor(None, self.resend.Batch.send, messages)
+        data = response["data"] if isinstance(response, dict) else response.data
+        return [item["id"] for item in data]
+
+    async def send(self, message):
+        return (await self.send_batch([message]))[0]
+
+
+class FakeEmailProvider:
+    """Local stand-in that records messages instead of sending them.
+
+    `latency` is added to every call and `fail_every` makes every Nth call raise,
+    which is enough to exercise the job queue offline.
+    """
+
+    max_batch_size = 100
+
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self.sent = []
+
+    async def send_batch(self, messages):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError("Fake provider failure")
+        self.sent.extend(messages)
+        logger.info(f"Fake provider accepted {len(messages)} emails")
+        return [str(uuid.uuid4()) for _ in messages]
+
+    async def send(self, message):
+        return (await self.send_batch([message]))[0]
+
+
+def get_email_provider(name, **kwargs):
+    if name == "resend":
+        return ResendProvider()
+    if name == "fake":
+        return FakeEmailProvider(**kwargs)
+    raise ValueError(f"Unknown email provider: {name}")
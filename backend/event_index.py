@@ -0,0 +1,313 @@
+"""Typed event records and an in-memory search index over them.
+
+Scraped events keep Eventbrite's display strings (eventDateTime, address) for existing
+clients. normalize_event() adds parsed, timezone-aware start/end times and a geocodable
+address next to them. EventIndex keeps the records in start-time order alongside an
+inverted text index, so keyword, date-range and paginated queries don't scan every event.
+"""
+import os
+import re
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+
+# Timezone for event times that don't name one, and for date-only query bounds
+EVENT_TIMEZONE = ZoneInfo(os.getenv('EVENT_TIMEZONE', 'America/Los_Angeles'))
+
+TZ_OFFSETS = {
+    'PST': -8, 'PDT': -7, 'MST': -7, 'MDT': -6, 'CST': -6, 'CDT': -5,
+    'EST': -5, 'EDT': -4, 'UTC': 0, 'GMT': 0
+}
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+DATE_RE = re.compile(r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{1,2})(?:,?\s+(\d{4}))?', re.I)
+TIME_RE = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?m\b\.?)?', re.I)
+TZ_RE = re.compile(r'\b([A-Z]{3})\s*$')
+RANGE_SPLIT_RE = re.compile(r'\s+[-–]\s+')
+
+ADDRESS_RE = re.compile(r'^(?P<head>.*?)[\s,]+(?P<region>[A-Z]{2})\s+(?P<postal_code>\d{5}(?:-\d{4})?)\s*$')
+STREET_SUFFIXES = {
+    'st', 'street', 'ave', 'avenue', 'blvd', 'boulevard', 'rd', 'road', 'way', 'dr', 'drive',
+    'pl', 'place', 'ln', 'lane', 'ct', 'court', 'ter', 'terrace', 'hwy', 'plaza', 'sq', 'square'
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = {'a', 'an', 'and', 'at', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+
+def _parse_date(match, now):
+    month = MONTHS.index(match.group(1).lower()[:3]) + 1
+    day = int(match.group(2))
+    if match.group(3):
+        return int(match.group(3)), month, day
+    # Listings leave the year out; an event more than ~3 months in the past must be next year's
+    year = now.year
+    try:
+        if datetime(year, month, day) < now.replace(tzinfo=None) - timedelta(days=90):
+            year += 1
+    except ValueError:
+        return None
+    return year, month, day
+
+
+def _parse_time(text):
+    """Return (hour, minute, meridiem) for the first time in text, meridiem being 'a', 'p' or None"""
+    match = TIME_RE.search(text)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0), (match.group(3) or '').lower() or None
+
+
+def _to_24h(hour, meridiem):
+    if meridiem == 'p' and hour < 12:
+        return hour + 12
+    if meridiem == 'a' and hour == 12:
+        return 0
+    return hour
+
+
+def _split_part(text, now):
+    """Pull the date out of one side of a range, returning it with the text left over"""
+    match = DATE_RE.search(text)
+    if not match:
+        return None, text
+    return _parse_date(match, now), text[:match.start()] + text[match.end():]
+
+
+def parse_event_datetime(text, now=None):
+    """Parse Eventbrite's display string into timezone-aware (start, end) datetimes.
+
+    Handles forms like "Saturday, January 13 · 7 - 10pm PST" and
+    "January 13 · 10am - January 14 · 5pm". Either value is None when it can't be parsed.
+    """
+    if not text:
+        return None, None
+    now = now or datetime.now(EVENT_TIMEZONE)
+
+    tz = EVENT_TIMEZONE
+    tz_match = TZ_RE.search(text)
+    if tz_match and tz_match.group(1) in TZ_OFFSETS:
+        tz = timezone(timedelta(hours=TZ_OFFSETS[tz_match.group(1)]), tz_match.group(1))
+        text = text[:tz_match.start()]
+
+    parts = RANGE_SPLIT_RE.split(text, maxsplit=1)
+    start_date, start_rest = _split_part(parts[0], now)
+    if start_date is None:
+        return None, None
+    end_date, end_rest = _split_part(parts[1], now) if len(parts) > 1 else (None, '')
+
+    start_time = _parse_time(start_rest)
+    end_time = _parse_time(end_rest) if len(parts) > 1 else None
+    # "7 - 10pm": a bare start hour takes the end's meridiem, and vice versa
+    start_meridiem = start_time[2] if start_time else None
+    end_meridiem = end_time[2] if end_time else None
+    if start_time and end_time:
+        start_meridiem = start_meridiem or end_meridiem
+        end_meridiem = end_meridiem or start_meridiem
+
+    try:
+        start = datetime(*start_date, tzinfo=tz)
+        if start_time:
+            start = start.replace(hour=_to_24h(start_time[0], start_meridiem), minute=start_time[1])
+
+        end = None
+        if end_time or end_date:
+            end = datetime(*(end_date or start_date), tzinfo=tz)
+            if end_time:
+                end = end.replace(hour=_to_24h(end_time[0], end_meridiem), minute=end_time[1])
+            if end < start and start_time and not start_time[2] and start_meridiem == 'p':
+                # "11 - 1pm" means 11am, not 11pm
+                start = start.replace(hour=start_time[0] % 12)
+            if end < start:
+                # Runs past midnight
+                end += timedelta(days=1)
+    except (ValueError, TypeError):
+        return None, None
+    return start, end
+
+
+@dataclass
+class Address:
+    street: Optional[str] = None
+    city: Optional[str] = None
+    region: Optional[str] = None
+    postal_code: Optional[str] = None
+    country: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "street": self.street,
+            "city": self.city,
+            "region": self.region,
+            "postalCode": self.postal_code,
+            "country": self.country
+        }
+
+
+def parse_address(text):
+    """Split a one-line US address ("1 Market St San Francisco, CA 94105") into components"""
+    if not text:
+        return Address()
+    text = ' '.join(text.split())
+    match = ADDRESS_RE.match(text)
+    if not match:
+        return Address(street=text)
+
+    head = match.group('head').strip(' ,')
+    street, city = head, None
+    if ',' in head:
+        street, city = (part.strip() for part in head.rsplit(',', 1))
+    else:
+        # No comma between street and city: split after the last street suffix
+        words = head.split()
+        for i in range(len(words) - 2, -1, -1):
+            if words[i].rstrip('.').lower() in STREET_SUFFIXES:
+                street, city = ' '.join(words[:i + 1]), ' '.join(words[i + 1:])
+                break
+    return Address(street or None, city, match.group('region'), match.group('postal_code'), 'US')
+
+
+def geocode_query(venue, address):
+    """One-line address for a geocoder, falling back to the venue name when there's no street"""
+    locality = ' '.join(filter(None, [address.region, address.postal_code]))
+    parts = [address.street, address.city, locality]
+    if not address.street:
+        parts.insert(0, venue)
+    query = ', '.join(part for part in parts if part)
+    return query or None
+
+
+def normalize_event(event, url=None, now=None):
+    """Add parsed times and a structured address to a scraped event dict, in place"""
+    if "startsAt" in event and (url is None or event.get("url") == url):
+        return event
+
+    starts_at, ends_at = parse_event_datetime(event.get('eventDateTime'), now)
+    address = parse_address(event.get('address'))
+    if url is not None:
+        event['url'] = url
+    event['startsAt'] = starts_at.isoformat() if starts_at else None
+    event['endsAt'] = ends_at.isoformat() if ends_at else None
+    event['addressComponents'] = address.to_dict()
+    event['geocodeQuery'] = geocode_query(event.get('location'), address)
+    return event
+
+
+@dataclass
+class EventRecord:
+    title: Optional[str]
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+    venue: Optional[str]
+    address: Address
+    description: Optional[str]
+    url: Optional[str]
+    event: dict = field(repr=False)  # the normalized event dict, as served to clients
+
+    @classmethod
+    def from_event(cls, event):
+        # Events restored from older snapshots haven't been normalized yet
+        event = normalize_event(event)
+        components = event.get('addressComponents') or {}
+        return cls(
+            title=event.get('eventTitle'),
+            starts_at=datetime.fromisoformat(event['startsAt']) if event.get('startsAt') else None,
+            ends_at=datetime.fromisoformat(event['endsAt']) if event.get('endsAt') else None,
+            venue=event.get('location'),
+            address=Address(
+                components.get('street'),
+                components.get('city'),
+                components.get('region'),
+                components.get('postalCode'),
+                components.get('country')
+            ),
+            description=event.get('description'),
+            url=event.get('url'),
+            event=event
+        )
+
+    def text(self):
+        address = self.address
+        return ' '.join(filter(None, [
+            self.title, self.venue, address.street, address.city, address.postal_code, self.description
+        ]))
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class EventIndex:
+    """Read-only index over one snapshot of events; rebuild it when the snapshot changes.
+
+    Records are stored in start-time order (undated events last), so every result list
+    comes out chronologically and a date range is a bisect over `_starts`.
+    """
+
+    def __init__(self, records: List[EventRecord]):
+        dated = sorted((r for r in records if r.starts_at), key=lambda r: r.starts_at)
+        self.records = dated + [r for r in records if not r.starts_at]
+        self._starts = [r.starts_at.timestamp() for r in dated]
+        self._ends = [(r.ends_at or r.starts_at).timestamp() for r in dated]
+        # Lets a range query find events that started earlier but are still running
+        self._max_duration = max((end - start for start, end in zip(self._starts, self._ends)), default=0)
+
+        postings = {}
+        for position, record in enumerate(self.records):
+            for token in set(tokenize(record.text())):
+                postings.setdefault(token, []).append(position)
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+    @classmethod
+    def from_events(cls, events):
+        return cls([EventRecord.from_event(event) for event in events])
+
+    def __len__(self):
+        return len(self.records)
+
+    def _match_token(self, token):
+        # Prefix match, so "concert" also finds "concerts"
+        lo = bisect_left(self._vocabulary, token)
+        hi = bisect_left(self._vocabulary, token + '\uffff')
+        matched = set()
+        for word in self._vocabulary[lo:hi]:
+            matched.update(self._postings[word])
+        return matched
+
+    def _match_query(self, query):
+        """Positions matching every word of the query, or None if it has no searchable words"""
+        matched = None
+        for token in tokenize(query):
+            positions = self._match_token(token)
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return set()
+        return matched
+
+    def _in_range(self, start, end):
+        """Positions of dated events overlapping [start, end)"""
+        lo = bisect_left(self._starts, start.timestamp() - self._max_duration) if start else 0
+        hi = bisect_left(self._starts, end.timestamp()) if end else len(self._starts)
+        if start is None:
+            return range(lo, hi)
+        after = start.timestamp()
+        return [position for position in range(lo, hi) if self._ends[position] >= after]
+
+    def search(self, query=None, start=None, end=None, limit=20, offset=0):
+        """Return (total matches, one page of EventRecords) in start-time order"""
+        positions = None
+        if start or end:
+            positions = self._in_range(start, end)
+        # A query of only stopwords or punctuation doesn't filter anything
+        matched = self._match_query(query) if query else None
+        if matched is not None:
+            if positions is None:
+                positions = sorted(matched)
+            else:
+                positions = [position for position in positions if position in matched]
+        if positions is None:
+            positions = range(len(self.records))
+        return len(positions), [self.records[position] for position in positions[offset:offset + limit]]
@@ -0,0 +1,160 @@
+"""Local stand-ins for Eventbrite, Yahoo Finance, OpenAI and LinkedIn.
+
+One aiohttp server answers all of them, with configurable latency and failure
+injection, so the backend can be exercised and benchmarked offline.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from aiohttp import web
+
+EVENT_PAGE = """<html><body>
+<h1 class="event-title css-0">{title}</h1>
+<span class="date-info__full-datetime">Saturday, January {day} · 7 - 10pm PST</span>
+<div class="location-info__address"><p class="location-info__address-text">Venue {index}</p>{index} Market St San Francisco, CA 94103</div>
+<div class="event-description__content"><p>{description}</p></div>
+</body></html>"""
+
+QUOTE_PAGE = """<html><body>
+<fin-streamer data-field="regularMarketPreviousClose">{previous_close:.2f}</fin-streamer>
+<fin-streamer data-field="regularMarketOpen">{market_open:.2f}</fin-streamer>
+</body></html>"""
+
+COMPLETION_TEXT = (
+    "San Francisco is buzzing this week with a mix of art, tech and music. "
+    "Expect packed venues downtown and plenty of options for every taste."
+)
+
+
+class FakeUpstreams:
+    """Serves every upstream the backend talks to.
+
+    `latency` (seconds, plus up to `jitter`) is added to every response and
+    `failure_rate` of requests get a 503, which exercises the client retries.
+    """
+
+    def __init__(self, events=50, latency=0.0, jitter=0.0, failure_rate=0.0, token_delay=0.0):
+        self.events = events
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.token_delay = token_delay
+        self.requests = {}
+        self._runner = None
+        self.url = None
+
+        self.app = web.Application(middlewares=[self._inject])
+        self.app.router.add_get("/d/ca--san-francisco/{category}/", self.listing)
+        self.app.router.add_get("/e/{event_id}", self.event)
+        self.app.router.add_get("/quote/{ticker}", self.quote)
+        self.app.router.add_post("/v1/chat/completions", self.chat_completion)
+        self.app.router.add_get("/v2/{resource}", self.linkedin)
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unknown"
+        self.requests[route] = self.requests.get(route, 0) + 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return web.Response(status=503, text="Injected failure")
+        return await handler(request)
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def listing(self, request):
+        page = int(request.query.get("page", 1))
+        per_page = 20
+        start = (page - 1) * per_page
+        links = "".join(
+            f'<a class="event-card-link" href="{self.url}/e/{i}?aff=listing">Event {i}</a>'
+            for i in range(start, min(start + per_page, self.events))
+        )
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    async def event(self, request):
+        index = int(request.match_info["event_id"])
+        html = EVENT_PAGE.format(
+            title=f"Event {index}",
+            day=index % 28 + 1,
+            index=index,
+            description=f"Description for event {index}. " * 20
+        )
+        return web.Response(text=html, content_type="text/html", headers={"ETag": f'"event-{index}"'})
+
+    async def quote(self, request):
+        seed = sum(map(ord, request.match_info["ticker"]))
+        html = QUOTE_PAGE.format(previous_close=seed * 1.5, market_open=seed * 1.51)
+        return web.Response(text=html, content_type="text/html")
+
+    async def linkedin(self, request):
+        resource = request.match_info["resource"]
+        return web.json_response({"resource": resource, "elements": []})
+
+    def _completion_text(self, body):
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        if "JSON array" in prompt:
+            count = len(re.findall(r"^\d+\. Event:", prompt, flags=re.MULTILINE))
+            return json.dumps([f"Insight {i}" for i in range(count)])
+        return COMPLETION_TEXT
+
+    async def chat_completion(self, request):
+        body = await request.json()
+        text = self._completion_text(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-3.5-turbo")
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 40, "total_tokens": 140}
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in re.findall(r"\S+\s*", text):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
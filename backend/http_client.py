@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import random
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+from resilience import CircuitBreaker, CircuitOpenError, hedged
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: CIMultiDict = field(default_factory=CIMultiDict)
+    text: str = ""
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpClient:
+    """Application-lifetime aiohttp session shared by every scraper and API call.
+
+    Owns a single pooled connector (keep-alive, per-host limits, DNS cache) and
+    applies the same timeouts and retry-with-backoff policy to all outbound requests.
+    Each host gets a circuit breaker, and every request (retries included) must finish
+    within `deadline` seconds.
+    Call `start()` on application startup and `close()` on shutdown.
+    """
+
+    def __init__(
+        self,
+        limit=100,
+        limit_per_host=10,
+        dns_cache_ttl=300,
+        connect_timeout=5.0,
+        read_timeout=15.0,
+        retries=2,
+        backoff=0.5,
+        deadline=30.0,
+        breaker_failures=5,
+        breaker_reset=30.0
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.breakers = {}  # host -> CircuitBreaker
+        self._session = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            logger.info("HTTP client started")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client closed")
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client is not started")
+        return self._session
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host, self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    async def request(self, method, url, deadline=None, hedge_after=None, **kwargs):
+        """Send a request through the host's circuit breaker, within a deadline.
+
+        With `hedge_after`, each attempt that hasn't answered after that many seconds is
+        raced against a duplicate request; only pass it for idempotent requests.
+        """
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {breaker.name}")
+        try:
+            result = await asyncio.wait_for(
+                self._send(method, url, hedge_after, **kwargs),
+                deadline if deadline is not None else self.deadline
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            raise
+        if result.status in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return result
+
+    async def _attempt(self, method, url, **kwargs):
+        async with self.session.request(method, url, **kwargs) as response:
+            text = await response.text()
+            return HttpResponse(str(response.url), response.status, CIMultiDict(response.headers), text)
+
+    async def _send(self, method, url, hedge_after=None, **kwargs):
+        """Send a request, retrying connection errors, timeouts and retryable statuses"""
+        attempt = 0
+        while True:
+            try:
+                if hedge_after:
+                    result = await hedged(lambda: self._attempt(method, url, **kwargs), hedge_after)
+                else:
+                    result = await self._attempt(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self._delay(attempt)
+                logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+            else:
+                if result.status not in RETRY_STATUSES or attempt >= self.retries:
+                    return result
+                delay = self._delay(attempt, result.headers.get("Retry-After"))
+                logger.warning(f"{method} {url} returned {result.status}, retrying in {delay:.2f}s")
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+
+class RateLimiter:
+    """Spaces out calls sharing a key so they start at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}  # key -> loop time of the next free slot
+
+    async def wait(self, key="default"):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(key, now))
+        self._next_slot[key] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class HostRateLimiter(RateLimiter):
+    """RateLimiter keyed by the host of each request URL"""
+
+    async def wait(self, url):
+        await super().wait(urlsplit(url).netloc)
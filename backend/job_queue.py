@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """In-process async job queue with a fixed number of workers.
+
+    Jobs are plain dicts that the handler updates as it makes progress, so
+    `get()` doubles as status polling. Job state lives in this process only.
+    """
+
+    def __init__(self, handler, workers=4, history=1000):
+        self.handler = handler
+        self.workers = workers
+        self.history = history
+        self._queue = None
+        self._jobs = OrderedDict()
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload):
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "payload": payload
+        }
+        self._jobs[job["id"]] = job
+        # Drop the oldest finished jobs once we're over the history limit
+        while len(self._jobs) > self.history:
+            oldest = next(iter(self._jobs.values()))
+            if oldest["status"] in ("queued", "running"):
+                break
+            self._jobs.popitem(last=False)
+
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            try:
+                await self.handler(job)
+                job["status"] = "completed"
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = datetime.now().isoformat()
+                self._queue.task_done()
@@ -0,0 +1,46 @@
+import fcntl
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Non-blocking exclusive file lock that elects one refresher among workers.
+
+    The OS releases the lock when the holding process exits, so any other worker can
+    take over leadership by calling `acquire()` again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # Record the holder for anyone inspecting the lock file
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info(f"Acquired leader lock {self.path} (pid {os.getpid()})")
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from sqlite_connections import ThreadLocalConnections
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class TieredLLMCache(BaseCache):
+    """LangChain LLM cache with an in-process LRU in front of a shared SQLite store.
+
+    The memory tier is bounded by `max_entries` and `ttl`. The disk tier runs in WAL
+    mode so several uvicorn workers can read and write the same file, and is pruned
+    by age and row count so it no longer grows without bound.
+    """
+
+    def __init__(
+        self,
+        database_path=".llm_cache.db",
+        max_entries=1024,
+        ttl=7 * 24 * 60 * 60,
+        max_disk_entries=50000,
+        prune_every=100
+    ):
+        self.database_path = database_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+
+        self._memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._connections = ThreadLocalConnections(database_path, timeout=10)
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "lookups": 0,
+            "lookup_seconds": 0.0
+        }
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at)")
+
+    def _connection(self):
+        return self._connections.get()
+
+    @staticmethod
+    def _key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _record(self, outcome, started):
+        with self._lock:
+            self._stats[outcome] += 1
+            self._stats["lookups"] += 1
+            self._stats["lookup_seconds"] += time.perf_counter() - started
+
+    def _disk_get(self, key):
+        row = self._connection().execute(
+            "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        return row
+
+    def lookup(self, prompt, llm_string):
+        started = time.perf_counter()
+        key = self._key(prompt, llm_string)
+
+        return_val = self._memory.get(key)
+        if return_val is not None:
+            self._record("memory_hits", started)
+            return return_val
+
+        try:
+            row = self._disk_get(key)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            row = None
+
+        if row is None:
+            self._record("misses", started)
+            return None
+
+        return_val = [loads(value) for value in json.loads(row[0])]
+        self._memory.set(key, return_val, expires_at=row[1] + self.ttl)
+        self._record("disk_hits", started)
+        return return_val
+
+    def update(self, prompt, llm_string, return_val):
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        self._memory.set(key, return_val)
+
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps([dumps(gen) for gen in return_val]), now)
+                )
+            with self._lock:
+                self._writes += 1
+                should_prune = self._writes % self.prune_every == 0
+            if should_prune:
+                self.prune()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache update failed: {e}")
+
+    async def alookup(self, prompt, llm_string):
+        # Memory hits are answered on the event loop; only the disk tier goes to a thread
+        started = time.perf_counter()
+        return_val = self._memory.get(self._key(prompt, llm_string))
+        if return_val is not None:
+            self._record("memory_hits", started)
+            return return_val
+        return await asyncio.get_running_loop().run_in_executor(None, self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        await asyncio.get_running_loop().run_in_executor(None, self.update, prompt, llm_string, return_val)
+
+    def prune(self):
+        """Drop expired rows and trim the disk tier to max_disk_entries, oldest first"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+
+    def clear(self, **kwargs):
+        self._memory.clear()
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    async def aclear(self, **kwargs):
+        await asyncio.get_running_loop().run_in_executor(None, self.clear)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["evictions"] = self._memory.evictions
+        stats["memory_entries"] = len(self._memory)
+        lookups = stats["lookups"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["avg_lookup_ms"] = stats["lookup_seconds"] * 1000 / lookups if lookups else 0.0
+        return stats
+
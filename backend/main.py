@@ -1,28 +1,46 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from starlette.requests import Request
 from fastapi.middleware.cors import CORSMiddleware
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime, timedelta
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import logging
-import aiohttp
 import asyncio
 import random
 import os
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
-from langchain.callbacks import StreamingStdOutCallbackHandler
-from langchain_community.cache import SQLiteCache
-from langchain.globals import set_llm_cache
-import resend
+import time
+import hashlib
+import math
+import weakref
+import threading
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from authlib.integrations.starlette_client import OAuth
-from starlette.config import Config
 from starlette.middleware.sessions import SessionMiddleware
 import json
+import orjson
+from urllib.parse import urlsplit, urlunsplit
+from http_client import HttpClient, HostRateLimiter, RateLimiter
+from email_providers import get_email_provider
+from job_queue import JobQueue
+from typing import List, Optional
+from ttl_cache import TTLCache
+from metrics import registry, span
+from admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    ClientRateLimiter,
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    client_key,
+    rejection_payload
+)
+from fastapi.responses import PlainTextResponse
+from snapshot_store import SnapshotStore
+from leader_lock import LeaderLock
+from parsers import parse_event_page, parse_listing_page, parse_stock_page
+from event_index import EVENT_TIMEZONE, EventIndex, normalize_event
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +50,94 @@ load_dotenv()  # This should be one of the first things that happens
 
 app = FastAPI()
 
+# Hot-path metrics, exposed on /metrics
+request_duration = registry.histogram("replance_http_request_duration_seconds", "HTTP request latency by route")
+cache_requests = registry.counter("replance_cache_requests_total", "Application cache lookups by cache and result")
+llm_first_token = registry.histogram("replance_llm_time_to_first_token_seconds", "Time to first streamed LLM token")
+last_refresh = registry.gauge("replance_last_refresh_timestamp_seconds", "Unix time the last cache refresh finished")
+llm_cache_stats = registry.gauge("replance_llm_cache", "LLM response cache counters by stat")
+upstream_circuit_open = registry.gauge("replance_upstream_circuit_open", "1 while an upstream host's circuit breaker is open")
+cached_data_age = registry.gauge("replance_cached_data_age_seconds", "Age of the data each cache entry is serving")
+admission_rejections = registry.counter("replance_admission_rejections_total", "Requests turned away with a 429, by reason")
+admission_load = registry.gauge("replance_admission_requests", "Requests running on or waiting for the LLM routes")
+
+# Full LLM prompts and replies are only logged for this fraction of calls
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+def log_payload(message):
+    if random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        logger.info(message)
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status
+        )
+
+# Routes that spend OpenAI/Resend credit and executor threads, guarded by a per-client
+# token bucket and a global cap on running and waiting requests
+LLM_ROUTES = [
+    "/api/events-summary",
+    "/api/send-email",
+    "/api/send-email/bulk",
+    "/api/test-email",
+    "/api/generate-linkedin-email"
+]
+RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', 10))  # per client, 0 disables
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', 5))
+# "memory" limits each worker separately; "sqlite" shares the buckets between a host's workers,
+# but costs a write transaction on an executor thread for every request to the LLM routes
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# Reverse proxies in front of the app that append to X-Forwarded-For. Clients are keyed by the
+# address that many entries from the right. With 0 they're keyed by the connecting address, so
+# behind a proxy every client shares the proxy's bucket (the Procfile sets 1 for Render's)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 0))
+
+if RATE_LIMIT_BACKEND == "sqlite":
+    rate_limit_store = SQLiteBucketStore(os.getenv('RATE_LIMIT_DB_PATH', '.rate_limits.db'))
+elif RATE_LIMIT_BACKEND == "memory":
+    rate_limit_store = MemoryBucketStore()
+else:
+    raise ValueError(f"Unknown rate limit backend: {RATE_LIMIT_BACKEND}")
+
+client_rate_limiter = ClientRateLimiter(rate_limit_store, RATE_LIMIT_PER_MINUTE / 60, RATE_LIMIT_BURST)
+admission = AdmissionController(
+    max_active=int(os.getenv('ADMISSION_MAX_ACTIVE', 32)),
+    max_queued=int(os.getenv('ADMISSION_MAX_QUEUED', 64)),
+    queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))
+)
+
+def record_rejection(reason, path):
+    admission_rejections.inc(reason=reason, route=path)
+    logger.warning(f"Rejected request to {path}: {reason}")
+
+# Added before CORS so CORS wraps it and 429s still carry CORS headers
+app.add_middleware(
+    AdmissionMiddleware,
+    paths=LLM_ROUTES,
+    limiter=client_rate_limiter,
+    admission=admission,
+    trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES,
+    on_reject=record_rejection,
+    # Mostly served from the summary cache; get_events_summary charges only for generation
+    handler_charged=["/api/events-summary"]
+)
+
 # CORS middleware setup
 app.add_middleware(
     CORSMiddleware,
@@ -55,14 +161,148 @@ app.add_middleware(
 cached_data = {
     "stock_data": {
         "data": None,
-        "last_updated": None
+        "last_updated": None,
+        "body": None,   # data serialised to JSON bytes, built on first read
+        "etag": None,
+        "refresh_error": None,  # why the last refresh failed, while we're serving older data
+        "partial": False        # data is what a refresh has collected so far
     },
     "event_data": {
         "data": None,
-        "last_updated": None
+        "last_updated": None,
+        "body": None,
+        "etag": None,
+        "refresh_error": None,
+        "partial": False
     }
 }
 
+def set_cached(name, data, last_updated=None, partial=False):
+    entry = cached_data[name]
+    entry["data"] = data
+    # Serialised lazily, so a crawl publishing partial results doesn't re-encode on every event
+    entry["body"] = None
+    entry["etag"] = None
+    entry["partial"] = partial
+    if not partial:
+        entry["last_updated"] = last_updated if last_updated is not None else datetime.now()
+        entry["refresh_error"] = None
+
+def touch_cached(name):
+    # A refresh found nothing new: the data, its bytes and ETag stay as they are
+    entry = cached_data[name]
+    entry["last_updated"] = datetime.now()
+    entry["refresh_error"] = None
+
+def cached_body(name):
+    """Return the JSON bytes and strong ETag for a cache entry, serialising it once per snapshot"""
+    entry = cached_data[name]
+    if entry["body"] is None and entry["data"] is not None:
+        body = orjson.dumps(entry["data"])
+        entry["etag"] = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        entry["body"] = body
+    return entry["body"], entry["etag"]
+
+# Cache for the generated events summary, tied to the current event_data snapshot
+SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', 6 * 60 * 60))  # seconds
+
+# Per-event insights, keyed by the event's content hash
+event_insights_cache = TTLCache(max_entries=10000, ttl=7 * 24 * 60 * 60)
+
+# Per-chunk summaries for the map-reduce path, keyed by a hash of the chunk's text
+chunk_summary_cache = TTLCache(max_entries=1024, ttl=SUMMARY_CACHE_TTL)
+
+# Search index over the current event_data snapshot, rebuilt when the snapshot changes
+event_index_cache = {
+    "data": None,   # the event_data dict the index was built from
+    "index": None
+}
+EVENT_PAGE_MAX_LIMIT = int(os.getenv('EVENT_PAGE_MAX_LIMIT', 100))
+
+summary_cache = {
+    "hash": None,        # content hash of the events the summary was built from
+    "data": None,        # response payload for /api/events-summary
+    "expires_at": 0.0,   # time.monotonic() deadline
+    "inflight": {}       # content hash -> asyncio.Task, for request coalescing
+}
+
+# On-disk copy of the caches, loaded on startup so workers serve data before their first refresh
+snapshot_store = SnapshotStore(os.getenv('SNAPSHOT_PATH', '.cache_snapshot.json.gz'))
+snapshot_mtime = None
+refresh_task = None
+refresh_running = False
+
+# Only the worker holding this lock refreshes the caches; the rest hot-swap its snapshots
+leader_lock = LeaderLock(os.getenv('LEADER_LOCK_PATH', '.refresh_leader.lock'))
+SNAPSHOT_POLL_SECONDS = int(os.getenv('SNAPSHOT_POLL_SECONDS', 30))
+
+# Shared outbound HTTP client, started and closed with the app
+http_client = HttpClient(
+    limit=int(os.getenv('HTTP_MAX_CONNECTIONS', 100)),
+    limit_per_host=int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', 10)),
+    dns_cache_ttl=int(os.getenv('HTTP_DNS_CACHE_TTL', 300)),
+    connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+    read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', 15)),
+    retries=int(os.getenv('HTTP_RETRIES', 2)),
+    backoff=float(os.getenv('HTTP_RETRY_BACKOFF', 0.5)),
+    deadline=float(os.getenv('HTTP_DEADLINE', 30)),  # seconds per request, retries included
+    breaker_failures=int(os.getenv('HTTP_BREAKER_FAILURES', 5)),
+    breaker_reset=float(os.getenv('HTTP_BREAKER_RESET', 30))
+)
+
+# Scrape requests still waiting after this long get a duplicate request raced against them
+SCRAPE_HEDGE_AFTER = float(os.getenv('SCRAPE_HEDGE_AFTER', 3)) or None
+# Longest a refresh stage may run before it's abandoned and the previous data kept
+REFRESH_STAGE_DEADLINE = float(os.getenv('REFRESH_STAGE_DEADLINE', 300))
+# Served data older than this is stale; the leader revalidates just that entry in the background,
+# at most once per STALE_REVALIDATE_INTERVAL, doubling up to STALE_REVALIDATE_MAX_INTERVAL while it keeps failing
+DATA_STALE_AFTER = int(os.getenv('DATA_STALE_AFTER', 25 * 60 * 60))
+STALE_REVALIDATE_INTERVAL = int(os.getenv('STALE_REVALIDATE_INTERVAL', 5 * 60))
+STALE_REVALIDATE_MAX_INTERVAL = int(os.getenv('STALE_REVALIDATE_MAX_INTERVAL', 60 * 60))
+revalidations = {}  # cache name -> (monotonic time of the last revalidation, consecutive failures)
+
+# Tickers scraped on every refresh; the first one is served at the top level of /api/stock-data
+STOCK_TICKERS = [t.strip().upper() for t in os.getenv('STOCK_TICKERS', 'ADBE').split(',') if t.strip()]
+
+# Eventbrite crawl settings
+# Upstream base URLs are overridable so the benchmark can point them at local fakes
+EVENTBRITE_URL = os.getenv('EVENTBRITE_URL', 'https://www.eventbrite.com')
+YAHOO_FINANCE_URL = os.getenv('YAHOO_FINANCE_URL', 'https://finance.yahoo.com')
+LINKEDIN_API_URL = os.getenv('LINKEDIN_API_URL', 'https://api.linkedin.com')
+
+EVENT_LISTING_URL = EVENTBRITE_URL + '/d/ca--san-francisco/{category}/'
+EVENT_CATEGORIES = [c.strip() for c in os.getenv('EVENT_CATEGORIES', 'all-events').split(',') if c.strip()]
+EVENT_LISTING_PAGES = int(os.getenv('EVENT_LISTING_PAGES', 1))
+EVENT_MAX_EVENTS = int(os.getenv('EVENT_MAX_EVENTS', 5))
+EVENT_CRAWL_CONCURRENCY = int(os.getenv('EVENT_CRAWL_CONCURRENCY', 8))
+EVENT_HOST_RATE = float(os.getenv('EVENT_HOST_RATE', 5))  # requests per second per host
+
+event_host_limiter = HostRateLimiter(EVENT_HOST_RATE)
+
+# Per-event-URL HTTP validators, page content hash and parsed event from the last crawl
+event_validators = {}
+
+# Refresh every N minutes when set, otherwise once a day at midnight
+REFRESH_INTERVAL_MINUTES = int(os.getenv('REFRESH_INTERVAL_MINUTES', 0))
+
+# HTML parsing is CPU-bound, so it runs in a process pool (0 falls back to the default thread pool)
+PARSER_PROCESSES = int(os.getenv('PARSER_PROCESSES', os.cpu_count() or 1))
+parser_pool = None
+
+def get_parser_pool():
+    global parser_pool
+    if parser_pool is None and PARSER_PROCESSES > 0:
+        # spawn, not fork: the parent already runs event loop and executor threads
+        parser_pool = ProcessPoolExecutor(
+            max_workers=PARSER_PROCESSES,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return parser_pool
+
+async def run_parser(parse, content):
+    with span("parse", parser=parse.__name__):
+        return await asyncio.get_event_loop().run_in_executor(get_parser_pool(), parse, content)
+
 # List of user-agents for rotation
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -73,22 +313,113 @@ user_agents = [
     'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:44.0) Gecko/20100101 Firefox/44.0',
 ]
 
-# Set up caching
-set_llm_cache(SQLiteCache(database_path=".langchain.db"))
-
 # Get API key from environment variable
 openai_api_key = os.getenv('OPENAI_API_KEY')
 if not openai_api_key:
     raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY environment variable")
 
-# Simplest possible initialization
-llm = ChatOpenAI(
-    api_key=openai_api_key,
-    model_name="gpt-3.5-turbo"
-)
+# LLM call limits: max concurrent calls per event loop, per-call timeout and client retries
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))  # seconds
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+# LangChain's verbose mode prints every prompt, which is too expensive to leave on at volume
+LLM_VERBOSE = os.getenv('LLM_VERBOSE', 'false').lower() == 'true'
+
+# LangChain and the OpenAI SDK take seconds to import, so the client, its response cache
+# and the chains are built on first use rather than at startup
+llm = None
+llm_cache = None
+chains = {}
+llm_lock = threading.RLock()  # get_llm/get_chain also run on the warm-up thread
+# Build them in a background thread after startup, so the first LLM request doesn't pay for it
+LLM_PREWARM = os.getenv('LLM_PREWARM', 'true').lower() == 'true'
+
+def get_llm():
+    """The single ChatOpenAI instance, so every chain shares one sync and one async OpenAI client"""
+    global llm, llm_cache
+    with llm_lock:
+        if llm is not None:
+            return llm
+        from langchain.globals import set_llm_cache
+        from langchain_openai import ChatOpenAI
+        from llm_cache import TieredLLMCache
+
+        # In-process LRU in front of a SQLite store shared by all workers
+        llm_cache = TieredLLMCache(
+            database_path=os.getenv('LLM_CACHE_PATH', '.llm_cache.db'),
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1024)),
+            ttl=int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 60 * 60)),
+            max_disk_entries=int(os.getenv('LLM_CACHE_MAX_DISK_ENTRIES', 50000))
+        )
+        set_llm_cache(llm_cache)
+        llm = ChatOpenAI(
+            api_key=openai_api_key,
+            model_name="gpt-3.5-turbo",
+            request_timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES
+        )
+        return llm
+
+def get_chain(name):
+    """The LLMChain for one of CHAIN_TEMPLATES, compiled on first use"""
+    chain = chains.get(name)
+    if chain is not None:
+        return chain
+    with llm_lock:
+        if name not in chains:
+            from langchain.chains import LLMChain
+            from langchain.prompts import ChatPromptTemplate
+
+            chains[name] = LLMChain(
+                llm=get_llm(),
+                prompt=ChatPromptTemplate.from_template(CHAIN_TEMPLATES[name]),
+                verbose=LLM_VERBOSE
+            )
+        return chains[name]
+
+def warm_llm():
+    started = time.perf_counter()
+    try:
+        for name in CHAIN_TEMPLATES:
+            get_chain(name)
+        logger.info(f"LLM client and chains ready in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Error preparing LLM client: {e}")
+    try:
+        load_tokenizer()
+    except Exception as e:
+        # get_tokenizer() tries again when the first summary needs it
+        logger.warning(f"Error loading tokenizer: {e!r}")
+
+# Semaphores are bound to the event loop they are first used on
+llm_semaphores = weakref.WeakKeyDictionary()
+
+def get_llm_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = llm_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+async def load_chain(name):
+    """get_chain() for coroutines: building a chain imports LangChain, so that runs on a thread.
+
+    While warm_llm holds llm_lock, it's the executor thread that waits for it, not the event loop.
+    """
+    chain = chains.get(name)
+    if chain is None:
+        chain = await asyncio.get_running_loop().run_in_executor(None, get_chain, name)
+    return chain
+
+async def run_chain(chain_name, **inputs):
+    """Run one of CHAIN_TEMPLATES natively on the event loop, bounded by LLM_MAX_CONCURRENCY and LLM_TIMEOUT"""
+    chain = await load_chain(chain_name)
+    async with get_llm_semaphore():
+        with span("llm_call"):
+            return await asyncio.wait_for(chain.arun(**inputs), timeout=LLM_TIMEOUT)
 
 # Create a prompt template for event analysis
-event_summary_prompt = ChatPromptTemplate.from_template("""
+EVENT_SUMMARY_TEMPLATE = """
 You are an AI event curator for San Francisco. Analyze these events and provide a brief overview:
 
 Events:
@@ -100,19 +431,74 @@ Please provide:
 3. A quick recommendation for different types of interests (e.g., for art lovers, tech enthusiasts, etc.)
 
 Keep your response concise and engaging. Format in markdown.
-""")
+"""
 
-analysis_chain = LLMChain(
-    llm=llm,
-    prompt=event_summary_prompt,
-    verbose=True
-)
+# Map-reduce prompts for event sets too large for a single summary call
+CHUNK_SUMMARY_TEMPLATE = """
+You are an AI event curator for San Francisco. Summarize this group of events:
+
+Events:
+{events_summary}
 
-# Initialize Resend
-resend.api_key = os.getenv('RESEND_API_KEY')
+List the most notable events and any themes they share as short bullet points.
+Include event names and dates. Keep it under 150 words.
+"""
+
+MERGE_SUMMARY_TEMPLATE = """
+You are an AI event curator for San Francisco. Below are summaries of several groups of events happening in SF:
+
+{chunk_summaries}
+
+Please provide:
+1. A 2-3 sentence overview of what's happening in SF right now
+2. Notable trends or patterns in these events
+3. A quick recommendation for different types of interests (e.g., for art lovers, tech enthusiasts, etc.)
+
+Keep your response concise and engaging. Format in markdown.
+"""
+
+# Per-event insights, generated for several events per prompt where possible
+EVENT_INSIGHT_TEMPLATE = """
+You are an AI event curator for San Francisco. Write a one or two sentence insight about this event:
+who it's for and why it's worth attending.
+
+Event: {title}
+When: {datetime}
+Where: {location}
+Description: {description}
+"""
+
+EVENT_INSIGHTS_BATCH_TEMPLATE = """
+You are an AI event curator for San Francisco. For each numbered event below, write a one or two
+sentence insight: who it's for and why it's worth attending.
+
+{events}
+
+Respond with only a JSON array of strings, one insight per event, in the same order.
+"""
+
+EVENT_INSIGHTS = os.getenv('EVENT_INSIGHTS', 'true').lower() == 'true'
+INSIGHTS_BATCH_SIZE = int(os.getenv('INSIGHTS_BATCH_SIZE', 10))
+INSIGHTS_MAX_CONCURRENCY = int(os.getenv('INSIGHTS_MAX_CONCURRENCY', 4))
+
+# Token budget per summary call, parallel chunk summaries, and the average events per chunk
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', 2000))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv('SUMMARY_MAX_CONCURRENCY', 4))
+SUMMARY_CHUNK_EVENTS = int(os.getenv('SUMMARY_CHUNK_EVENTS', 20))
+
+# Email delivery: provider ("resend", or "fake" to test offline), bulk job workers and batching
+EMAIL_PROVIDER = os.getenv('EMAIL_PROVIDER', 'resend')
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', 4))
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 20))
+EMAIL_SEND_RATE = float(os.getenv('EMAIL_SEND_RATE', 2))  # provider calls per second
+# The rate limiter counts a bulk request once, so cap how many LLM generations one can queue
+EMAIL_BULK_MAX = int(os.getenv('EMAIL_BULK_MAX', 200))
+
+email_provider = get_email_provider(EMAIL_PROVIDER)
+email_send_limiter = RateLimiter(EMAIL_SEND_RATE)
 
 # Add the email prompt template
-email_prompt = ChatPromptTemplate.from_template("""
+EMAIL_TEMPLATE = """
 You are a friendly AI assistant writing a fun, personalized email. Use the following information to craft a warm, engaging message:
 
 Name: {name}
@@ -127,13 +513,65 @@ Write a friendly email that:
 4. Ends with a warm sign-off
 
 Keep the tone light and friendly. The email should be 3-4 short paragraphs.
-""")
+"""
+
+# Body-only prompt for "templated" generation: the body depends only on the interests,
+# so it can be shared by every recipient who has the same ones
+EMAIL_BODY_TEMPLATE = """
+You are a friendly AI assistant writing the middle of a fun, personalized email. Use the following information:
+
+Hobbies: {hobbies}
+Favorite Artist: {artist}
+Favorite Movie: {movie}
+
+Write 2-3 short paragraphs that:
+1. Make interesting connections between their hobbies, favorite artist, and movie
+2. Suggest a fun activity based on their interests
+
+Do not include a greeting, a name, or a sign-off; those are added separately.
+Keep the tone light and friendly.
+"""
 
-email_chain = LLMChain(
-    llm=llm,
-    prompt=email_prompt,
-    verbose=True
+# "personal" writes every email from scratch; "templated" reuses cached bodies per set of interests
+EMAIL_GENERATION_MODE = os.getenv('EMAIL_GENERATION_MODE', 'personal')
+EMAIL_SIGN_OFF = os.getenv('EMAIL_SIGN_OFF', 'Warmly,\nThe Replance Team')
+
+email_body_cache = TTLCache(
+    max_entries=int(os.getenv('EMAIL_BODY_CACHE_SIZE', 5000)),
+    ttl=int(os.getenv('EMAIL_BODY_CACHE_TTL', 24 * 60 * 60))
 )
+email_body_inflight = {}  # interests key -> asyncio.Task
+
+# Prompt for emails generated from a LinkedIn profile
+LINKEDIN_TEMPLATE = """
+You are writing a personalized email based on someone's LinkedIn profile.
+
+Profile Information:
+Name: {name}
+Current Position: {current_position}
+Company: {company}
+Experience: {experience}
+Education: {education}
+
+Write an engaging email that:
+1. Acknowledges their professional background
+2. Makes interesting connections between their experiences
+3. Suggests potential career opportunities or growth areas
+4. Ends with a professional call to action
+
+Keep the tone professional but friendly.
+"""
+
+CHAIN_TEMPLATES = {
+    "analysis": EVENT_SUMMARY_TEMPLATE,
+    "chunk_summary": CHUNK_SUMMARY_TEMPLATE,
+    "merge_summary": MERGE_SUMMARY_TEMPLATE,
+    "event_insight": EVENT_INSIGHT_TEMPLATE,
+    "event_insights_batch": EVENT_INSIGHTS_BATCH_TEMPLATE,
+    "email": EMAIL_TEMPLATE,
+    "email_body": EMAIL_BODY_TEMPLATE,
+    "linkedin": LINKEDIN_TEMPLATE
+}
 
 # Add this class to define the expected request body structure
 class EmailFormData(BaseModel):
@@ -143,178 +581,437 @@ class EmailFormData(BaseModel):
     artist: str
     movie: str
 
-async def fetch_event_data(url_subA, session):
+async def fetch_event_data(url_subA):
     headers = {'User-Agent': random.choice(user_agents)}
+    key = normalize_event_url(url_subA)
+    previous = event_validators.get(key)
+    if previous:
+        # Let the origin answer 304 when the page hasn't changed
+        if previous["etag"]:
+            headers['If-None-Match'] = previous["etag"]
+        if previous["last_modified"]:
+            headers['If-Modified-Since'] = previous["last_modified"]
     try:
-        async with session.get(url_subA, headers=headers) as response:
-            if response.status == 200:
-                content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
-
-                event_title = soup.find('h1', class_='event-title css-0')
-                event_title = event_title.text.strip() if event_title else None
-
-                event_date_time = soup.find('span', class_='date-info__full-datetime')
-                event_date_time = event_date_time.text.strip() if event_date_time else None
-
-                location_info_tag = soup.find('div', class_='location-info__address')
-                location_name = None
-                address = None
-                if location_info_tag:
-                    location_name_tag = location_info_tag.find('p', class_='location-info__address-text')
-                    location_name = location_name_tag.get_text(strip=True) if location_name_tag else None
-
-                    address_parts = location_info_tag.contents
-                    address_text = ''
-                    for part in address_parts:
-                        if isinstance(part, str):
-                            address_text += part.strip() + " "
-                    address = address_text.replace(location_name, "").strip() if location_name else address_text.strip()
-
-                description_tag = soup.find('div', class_='event-description__content')
-                description = description_tag.get_text(separator=" ", strip=True)[:300] if description_tag else "Description not found."
-
-                return {
-                    'eventTitle': event_title,
-                    'eventDateTime': event_date_time,
-                    'location': location_name,
-                    'address': address,
-                    'description': description
-                }
+        with span("fetch_event"):
+            response = await http_client.get(url_subA, headers=headers, hedge_after=SCRAPE_HEDGE_AFTER)
+        if response.status == 304 and previous:
+            return previous["event"]
+        if response.status == 200:
+            content = response.text
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if previous and previous["content_hash"] == content_hash:
+                event = previous["event"]
+            else:
+                event = normalize_event(await run_parser(parse_event_page, content), url=key)
+            event_validators[key] = {
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "content_hash": content_hash,
+                "event": event
+            }
+            return event
     except Exception as e:
-        logger.error(f"Error fetching event data from {url_subA}: {e}")
+        if previous:
+            # Keep serving what we scraped last time rather than dropping the event
+            logger.warning(f"Error fetching event data from {url_subA}, reusing previous data: {e!r}")
+            return previous["event"]
+        logger.error(f"Error fetching event data from {url_subA}: {e!r}")
         return None
 
-async def enhance_event_data(event_data):
-    """Add AI-generated insights to each event using Llama 2"""
-    enhanced_events = []
-    
-    for event in event_data:
+def hash_event(event):
+    """Content hash of a scraped event, ignoring fields added after scraping"""
+    fields = {k: v for k, v in event.items() if k != 'aiInsights'}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+async def generate_insights_batch(events):
+    """One LLM call for several events; falls back to per-event calls if the reply doesn't parse"""
+    if len(events) > 1:
         try:
-            # Run analysis in a separate thread to not block async operations
-            ai_insights = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: analysis_chain.run(
-                    title=event['eventTitle'],
-                    datetime=event['eventDateTime'],
-                    location=event['location'],
-                    description=event['description']
-                )
+            reply = await run_chain(
+                "event_insights_batch",
+                events="\n\n".join(f"{i}. {format_event(e)}" for i, e in enumerate(events, 1))
             )
-            
-            event['aiInsights'] = ai_insights
-            logger.info(f"Generated AI insights for event: {event['eventTitle']}")
-            enhanced_events.append(event)
-            
+            # Models sometimes wrap JSON in a markdown code fence
+            reply = reply.strip().strip('`')
+            insights = json.loads(reply[4:] if reply.startswith('json') else reply)
+            if isinstance(insights, list) and len(insights) == len(events) and all(isinstance(i, str) for i in insights):
+                return insights
+            logger.warning("Batched insights reply didn't match the events, falling back to single calls")
+        except Exception as e:
+            logger.warning(f"Batched insights failed, falling back to single calls: {e}")
+
+    return await asyncio.gather(*(
+        run_chain(
+            "event_insight",
+            title=e['eventTitle'],
+            datetime=e['eventDateTime'],
+            location=e['location'],
+            description=e['description']
+        )
+        for e in events
+    ))
+
+async def enhance_event_data(event_data):
+    """Return copies of the events with AI-generated insights, paying only for events not seen before.
+
+    The scraped dicts may already be served (the crawl publishes them as they arrive) and are
+    reused by the next crawl, so they're never edited in place.
+    """
+    insights = [event_insights_cache.get(hash_event(event)) for event in event_data]
+    pending = [position for position, insight in enumerate(insights) if insight is None]
+    for insight in insights:
+        record_cache("event_insights", insight is not None)
+
+    if pending:
+        logger.info(f"Generating AI insights for {len(pending)} of {len(event_data)} events")
+    semaphore = asyncio.Semaphore(INSIGHTS_MAX_CONCURRENCY)
+
+    async def enhance_batch(batch):
+        events = [event_data[position] for position in batch]
+        try:
+            async with semaphore:
+                generated = await generate_insights_batch(events)
+            for position, event, insight in zip(batch, events, generated):
+                insights[position] = insight
+                event_insights_cache.set(hash_event(event), insight)
         except Exception as e:
             logger.error(f"Error generating AI insights: {e}")
-            event['aiInsights'] = "Unable to generate insights"
-            enhanced_events.append(event)
-    
-    return enhanced_events
+            for position in batch:
+                insights[position] = "Unable to generate insights"
+
+    batches = [pending[i:i + INSIGHTS_BATCH_SIZE] for i in range(0, len(pending), INSIGHTS_BATCH_SIZE)]
+    await asyncio.gather(*(enhance_batch(batch) for batch in batches))
+    return [{**event, 'aiInsights': insight} for event, insight in zip(event_data, insights)]
+
+def normalize_event_url(href):
+    # Listing links carry tracking query strings; drop them so the same event dedupes
+    parts = urlsplit(href)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+
+async def fetch_listing_page(category, page):
+    """Return the event URLs linked from one Eventbrite listing page"""
+    headers = {'User-Agent': random.choice(user_agents)}
+    url = EVENT_LISTING_URL.format(category=category)
+    params = {'page': page} if page > 1 else None
+    try:
+        await event_host_limiter.wait(url)
+        with span("fetch_listing"):
+            response = await http_client.get(url, headers=headers, params=params, hedge_after=SCRAPE_HEDGE_AFTER)
+        if response.status != 200:
+            logger.error(f"Failed to fetch event list {category} page {page}: {response.status}")
+            return None
+
+        return await run_parser(parse_listing_page, response.text)
+    except Exception as e:
+        logger.error(f"Error fetching event list {category} page {page}: {e}")
+        return None
+
+async def crawl_event_urls():
+    """Walk every category's listing pages and return unique event URLs, capped at EVENT_MAX_EVENTS"""
+    pages = [(category, page) for category in EVENT_CATEGORIES for page in range(1, EVENT_LISTING_PAGES + 1)]
+    results = await asyncio.gather(*(fetch_listing_page(category, page) for category, page in pages))
+    if all(result is None for result in results):
+        return None
+
+    event_urls = {}
+    for hrefs in results:
+        for href in hrefs or []:
+            event_urls.setdefault(normalize_event_url(href), href)
+    return list(event_urls.values())[:EVENT_MAX_EVENTS]
+
+async def crawl_events(event_urls, on_event=None):
+    """Fetch event detail pages through a bounded pool of workers.
 
-async def scrape_events():
+    Results keep the order of `event_urls`, whatever order the fetches finish in, so an
+    unchanged crawl produces an identical list. `on_event` is called with the events
+    parsed so far each time one arrives.
+    """
+    queue = asyncio.Queue()
+    for position, url in enumerate(event_urls):
+        queue.put_nowait((position, url))
+    results = [None] * len(event_urls)
+
+    def completed():
+        return [event for event in results if event is not None]
+
+    async def worker():
+        while not queue.empty():
+            position, url = queue.get_nowait()
+            await event_host_limiter.wait(url)
+            data = await fetch_event_data(url)
+            if data is not None:
+                results[position] = data
+                if on_event:
+                    on_event(completed())
+
+    workers = min(EVENT_CRAWL_CONCURRENCY, len(event_urls))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return completed()
+
+async def scrape_events(on_event=None):
     try:
         logger.info("Starting events scrape...")
-        headers = {'User-Agent': random.choice(user_agents)}
+
+        # First, get the list of event URLs
+        event_urls = await crawl_event_urls()
+        if event_urls is None:
+            return None
+        logger.info(f"Found {len(event_urls)} event URLs")
+
+        event_data = await crawl_events(event_urls, on_event)
+
+        # Forget validators for events that have dropped off the listings
+        crawled = {normalize_event_url(url) for url in event_urls}
+        for key in set(event_validators) - crawled:
+            del event_validators[key]
         
-        async with aiohttp.ClientSession() as session:
-            # First, get the list of event URLs
-            url = 'https://www.eventbrite.com/d/ca--san-francisco/all-events/'
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch event list: {response.status}")
-                    return None
-                
-                content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
-                event_links = soup.find_all('a', class_='event-card-link', href=True)
-                event_urls = list(set(event_link['href'] for event_link in event_links))[:5]  # Limit to 5 events
-                
-                # Fetch all event details concurrently
-                tasks = [fetch_event_data(url, session) for url in event_urls]
-                event_data = await asyncio.gather(*tasks)
-                event_data = [data for data in event_data if data is not None]
-                
-                if event_data:
-                    return {
-                        "events": event_data,
-                        "lastUpdated": datetime.now().isoformat()
-                    }
-                return None
+        if event_data:
+            return {
+                "events": event_data,
+                "lastUpdated": datetime.now().isoformat()
+            }
+        return None
                 
     except Exception as e:
         logger.error(f"Error occurred during events scraping: {e}")
         return None
 
-async def update_cache():
+def record_refresh_error(name, error):
+    # The previous data stays in place and is served as stale until a refresh succeeds
+    cached_data[name]["refresh_error"] = error
+    logger.error(f"Refreshing {name} failed, serving previous data: {error}")
+
+async def update_stock_cache():
     try:
         # Update stock data
         logger.info("Attempting stock cache update...")
-        stock_data = scrape_adobe_stock()
+        with span("scrape_stocks"):
+            stock_data = await asyncio.wait_for(scrape_stocks(), REFRESH_STAGE_DEADLINE)
         if stock_data:
-            cached_data["stock_data"]["data"] = stock_data
-            cached_data["stock_data"]["last_updated"] = datetime.now()
+            set_cached("stock_data", stock_data)
             logger.info(f"Stock cache updated successfully at {cached_data['stock_data']['last_updated']}")
         else:
-            logger.error("Failed to fetch stock data")
+            record_refresh_error("stock_data", "Failed to fetch stock data")
+    except asyncio.TimeoutError:
+        record_refresh_error("stock_data", f"Stock refresh exceeded {REFRESH_STAGE_DEADLINE}s")
     except Exception as e:
-        logger.error(f"Error updating stock cache: {e}")
-    
+        record_refresh_error("stock_data", f"Error updating stock cache: {e!r}")
+
+def publish_partial_events(events):
+    # Serve crawl results as they arrive, but never replace a larger snapshot with a partial one,
+    # nor the same events with copies that don't have their insights yet. Until the refresh
+    # completes they keep the previous data's age and are served as stale
+    current = (cached_data["event_data"]["data"] or {}).get("events") or []
+    if len(events) > len(current) or (len(events) == len(current) and hash_events(events) != hash_events(current)):
+        set_cached("event_data", {
+            "events": list(events),
+            "lastUpdated": datetime.now().isoformat()
+        }, partial=True)
+
+async def update_event_cache():
     try:
         # Update event data
         logger.info("Attempting events cache update...")
-        events_data = await scrape_events()
-        if events_data:
-            cached_data["event_data"]["data"] = events_data
-            cached_data["event_data"]["last_updated"] = datetime.now()
+        # What was served before this refresh; insights go on copies, so these dicts still hold what clients saw
+        previous = cached_data["event_data"]["data"]
+        with span("scrape_events"):
+            events_data = await asyncio.wait_for(scrape_events(on_event=publish_partial_events), REFRESH_STAGE_DEADLINE)
+        if events_data and EVENT_INSIGHTS:
+            with span("event_insights"):
+                events_data["events"] = await enhance_event_data(events_data["events"])
+        unchanged = (
+            events_data and previous is not None
+            and cached_data["event_data"]["data"] is previous
+            and events_data["events"] == previous.get("events")
+        )
+        if unchanged:
+            touch_cached("event_data")
+            logger.info("Events unchanged since the last refresh")
+        elif events_data:
+            set_cached("event_data", events_data)
+            get_event_index()
             logger.info(f"Events cache updated successfully at {cached_data['event_data']['last_updated']}")
         else:
-            logger.error("Failed to fetch events data")
+            record_refresh_error("event_data", "Failed to fetch events data")
+    except asyncio.TimeoutError:
+        record_refresh_error("event_data", f"Events refresh exceeded {REFRESH_STAGE_DEADLINE}s")
+    except Exception as e:
+        record_refresh_error("event_data", f"Error updating events cache: {e!r}")
+
+    try:
+        # Precompute the summary for the new snapshot so the endpoint is a cache read
+        events = (cached_data["event_data"]["data"] or {}).get("events")
+        if events:
+            await get_cached_summary(events)
+            logger.info("Events summary precomputed")
+    except Exception as e:
+        logger.error(f"Error precomputing events summary: {e}")
+
+async def update_cache(names=None):
+    """Refresh the named cache entries (all of them by default) and save a snapshot.
+
+    Returns False without doing anything if a refresh was already running.
+
+    The scheduled job, the startup refresh and stale revalidation all come through here,
+    so two refreshes never scrape at the same time.
+    """
+    global refresh_running
+    if refresh_running:
+        logger.info("Refresh already running, skipping this one")
+        return False
+    refresh_running = True
+    try:
+        # Stocks and events come from different upstreams, so refresh them side by side
+        with span("refresh"):
+            await asyncio.gather(*(stage() for name, stage in REFRESH_STAGES.items() if names is None or name in names))
+    finally:
+        refresh_running = False
+    last_refresh.set(time.time())
+
+    try:
+        await save_snapshot()
     except Exception as e:
-        logger.error(f"Error updating events cache: {e}")
+        logger.error(f"Error saving cache snapshot: {e}")
+    return True
+
+REFRESH_STAGES = {
+    "stock_data": update_stock_cache,
+    "event_data": update_event_cache
+}
+
+def build_snapshot():
+    def entry(name):
+        last_updated = cached_data[name]["last_updated"]
+        return {
+            "data": cached_data[name]["data"],
+            "last_updated": last_updated.isoformat() if last_updated else None,
+            "refresh_error": cached_data[name]["refresh_error"],
+            "partial": cached_data[name]["partial"]
+        }
+
+    return {
+        "stock_data": entry("stock_data"),
+        "event_data": entry("event_data"),
+        "summary": {"hash": summary_cache["hash"], "data": summary_cache["data"]},
+        "event_validators": dict(event_validators)
+    }
+
+def restore_snapshot(snapshot):
+    for name in ("stock_data", "event_data"):
+        entry = snapshot.get(name) or {}
+        if entry.get("data"):
+            last_updated = entry.get("last_updated")
+            set_cached(name, entry["data"], datetime.fromisoformat(last_updated) if last_updated else None)
+            cached_data[name]["refresh_error"] = entry.get("refresh_error")
+            cached_data[name]["partial"] = entry.get("partial", False)
+
+    summary = snapshot.get("summary") or {}
+    if summary.get("data"):
+        # Keep the summary only for what's left of its TTL
+        age = (datetime.now() - datetime.fromisoformat(summary["data"]["lastUpdated"])).total_seconds()
+        if age < SUMMARY_CACHE_TTL:
+            summary_cache["hash"] = summary["hash"]
+            summary_cache["data"] = summary["data"]
+            summary_cache["expires_at"] = time.monotonic() + SUMMARY_CACHE_TTL - age
 
-def scrape_adobe_stock():
+    event_validators.clear()
+    event_validators.update(snapshot.get("event_validators") or {})
+
+    # Seed the insights cache so a warm start doesn't pay for insights again
+    for event in (cached_data["event_data"]["data"] or {}).get("events") or []:
+        insight = event.get('aiInsights')
+        if insight and insight != "Unable to generate insights":
+            event_insights_cache.set(hash_event(event), insight)
+
+async def save_snapshot():
+    global snapshot_mtime
+    snapshot = build_snapshot()
+    await asyncio.get_event_loop().run_in_executor(None, snapshot_store.save, snapshot)
+    snapshot_mtime = snapshot_store.mtime()
+    logger.info(f"Cache snapshot saved to {snapshot_store.path}")
+
+def load_snapshot():
+    global snapshot_mtime
+    mtime = snapshot_store.mtime()
+    snapshot = snapshot_store.load()
+    if not snapshot:
+        logger.info("No cache snapshot found, starting cold")
+        return False
+    restore_snapshot(snapshot)
+    snapshot_mtime = mtime
+    logger.info(f"Cache snapshot loaded from {snapshot_store.path}")
+    return True
+
+async def follow_leader():
+    """Follower job: hot-swap the leader's newest snapshot, or take over if the leader is gone"""
+    global snapshot_mtime
+    if leader_lock.acquire():
+        logger.info("Leader lock was free, promoting this worker to refresher")
+        become_leader()
+        return
+
+    mtime = snapshot_store.mtime()
+    if mtime != snapshot_mtime:
+        # Read and decode off the loop, then swap the new data in on it
+        snapshot = await asyncio.get_event_loop().run_in_executor(None, snapshot_store.load)
+        if snapshot:
+            restore_snapshot(snapshot)
+            snapshot_mtime = mtime
+            logger.info("Hot-swapped cache snapshot from the leader")
+
+async def fetch_stock(ticker):
     try:
-        logger.info("Starting scrape...")
+        logger.info(f"Starting {ticker} scrape...")
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get('https://finance.yahoo.com/quote/ADBE', headers=headers)
-        logger.info(f"Yahoo response status: {response.status_code}")
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        previous_close = soup.find('fin-streamer', {'data-field': 'regularMarketPreviousClose'})
-        market_open = soup.find('fin-streamer', {'data-field': 'regularMarketOpen'})
-        
-        logger.info(f"Found previous close: {previous_close is not None}")
-        logger.info(f"Found market open: {market_open is not None}")
+        with span("fetch_stock"):
+            response = await http_client.get(
+                f'{YAHOO_FINANCE_URL}/quote/{ticker}', headers=headers, hedge_after=SCRAPE_HEDGE_AFTER
+            )
+        logger.info(f"Yahoo response status for {ticker}: {response.status}")
+        if response.status != 200:
+            logger.error(f"Failed to fetch {ticker} quote: {response.status}")
+            return None
         
-        if previous_close and market_open:
-            data = {
-                "previousClose": previous_close.text,
-                "marketOpen": market_open.text,
-                "lastUpdated": datetime.now().isoformat()
-            }
+        data = await run_parser(parse_stock_page, response.text)
+        if data:
+            data["symbol"] = ticker
+            data["lastUpdated"] = datetime.now().isoformat()
             logger.info(f"Scraped data: {data}")
             return data
             
-        logger.warning("Failed to find stock data elements")
+        logger.warning(f"Failed to find stock data elements for {ticker}")
         return None
         
     except Exception as e:
-        logger.error(f"Error occurred during scraping: {e}")
+        logger.error(f"Error occurred during {ticker} scraping: {e}")
+        return None
+
+async def scrape_stocks():
+    """Fetch every ticker in STOCK_TICKERS concurrently.
+
+    The first ticker's quote stays at the top level so existing clients keep working;
+    all quotes are under "tickers".
+    """
+    results = await asyncio.gather(*(fetch_stock(ticker) for ticker in STOCK_TICKERS))
+    tickers = {ticker: data for ticker, data in zip(STOCK_TICKERS, results) if data}
+    if not tickers:
         return None
 
+    data = dict(tickers.get(STOCK_TICKERS[0], {}))
+    data["tickers"] = tickers
+    data["lastUpdated"] = datetime.now().isoformat()
+    return data
+
 @app.get("/api/stock-data")
-async def get_stock_data():
+async def get_stock_data(request: Request):
     logger.info(f"Current stock cache status - has data: {cached_data['stock_data']['data'] is not None}")
     
     if cached_data["stock_data"]["data"]:
         logger.info("Returning cached stock data")
-        return cached_data["stock_data"]["data"]
+        return cached_response(request, "stock_data")
     
     logger.error("No stock data available in cache")
     return {"error": "Failed to fetch stock data"}
@@ -323,24 +1020,188 @@ async def get_stock_data():
 async def root():
     return {"message": "Server is running"}
 
-# Modify the scheduler to run daily
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    lambda: asyncio.run(update_cache()),
-    'cron',
-    hour=0,  # Run at midnight
-    minute=0,
-    next_run_time=datetime.now()  # Still run immediately on startup
-)
-scheduler.start()
+@app.get("/metrics")
+async def get_metrics():
+    if llm_cache is not None:
+        for stat, value in llm_cache.stats().items():
+            llm_cache_stats.set(value, stat=stat)
+    admission_load.set(admission.active, state="active")
+    admission_load.set(admission.queued, state="queued")
+    for host, breaker in http_client.breakers.items():
+        upstream_circuit_open.set(int(breaker.state != "closed"), host=host)
+    for name in cached_data:
+        age = data_age(name)
+        if age is not None:
+            cached_data_age.set(round(age, 3), cache=name)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# Modify the scheduler to run daily, on the app's event loop so it can share the HTTP client
+scheduler = AsyncIOScheduler()
+
+def become_leader():
+    global refresh_task
+    if scheduler.get_job('follow_leader'):
+        scheduler.remove_job('follow_leader')
+
+    if REFRESH_INTERVAL_MINUTES > 0:
+        # Unchanged events are reused, so frequent refreshes stay cheap
+        scheduler.add_job(update_cache, 'interval', minutes=REFRESH_INTERVAL_MINUTES, id='refresh')
+    else:
+        scheduler.add_job(
+            update_cache,
+            'cron',
+            hour=0,  # Run at midnight
+            minute=0,
+            id='refresh'
+        )
+    refresh_task = asyncio.create_task(update_cache())
+    logger.info("Initial cache update started in the background")
+
+def become_follower():
+    scheduler.add_job(follow_leader, 'interval', seconds=SNAPSHOT_POLL_SECONDS, id='follow_leader')
+    logger.info(f"Another worker is refreshing, following {snapshot_store.path}")
+
+def data_age(name):
+    last_updated = cached_data[name]["last_updated"]
+    return (datetime.now() - last_updated).total_seconds() if last_updated else None
+
+def is_stale(name):
+    age = data_age(name)
+    entry = cached_data[name]
+    return entry["partial"] or entry["refresh_error"] is not None or age is None or age > DATA_STALE_AFTER
+
+def revalidate_stale(name):
+    """Stale-while-revalidate: start a background refresh of `name` on the leader, without waiting for it"""
+    global refresh_task
+    last, failures = revalidations.get(name, (0.0, 0))
+    interval = min(STALE_REVALIDATE_INTERVAL * 2 ** failures, STALE_REVALIDATE_MAX_INTERVAL)
+    if not leader_lock.held or refresh_running or time.monotonic() - last < interval:
+        return
+    revalidations[name] = (time.monotonic(), failures)
+    logger.info(f"Serving stale {name}, revalidating it in the background")
+    refresh_task = asyncio.create_task(revalidate(name))
+
+async def revalidate(name):
+    if not await update_cache([name]):
+        return
+    last, failures = revalidations[name]
+    if cached_data[name]["refresh_error"] is None:
+        revalidations[name] = (last, 0)
+    else:
+        revalidations[name] = (last, failures + 1)
+        logger.warning(f"Revalidating {name} failed {failures + 1} times in a row, backing off")
+
+def cache_control(stale=False):
+    """Let clients reuse a response until the next scheduled refresh (or snapshot poll, on followers)"""
+    if refresh_running or stale:
+        # New data is on its way, so clients should revalidate every time
+        return "no-cache"
+    job = scheduler.get_job('refresh') or scheduler.get_job('follow_leader')
+    if job is None or job.next_run_time is None:
+        return "no-cache"
+    max_age = int((job.next_run_time - datetime.now(job.next_run_time.tzinfo)).total_seconds())
+    return f"public, max-age={max(0, max_age)}"
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def cached_response(request: Request, name, variant=None, render=None):
+    """Serve a cache entry's pre-serialised bytes, or a 304 when the client already has them.
+
+    With `variant` and `render`, the response is render()'s payload derived from the entry,
+    and its ETag is the entry's plus the variant, so 304s still skip the work.
+    """
+    body, etag = cached_body(name)
+    if variant is not None:
+        base = etag.strip('"')
+        etag = f'"{base}-{variant}"'
+    stale = is_stale(name)
+    if stale:
+        revalidate_stale(name)
+    age = data_age(name)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control(stale),
+        "X-Data-Age": str(int(age)) if age is not None else "unknown",
+        "X-Data-Stale": "true" if stale else "false"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        record_cache(f"{name}_etag", True)
+        return Response(status_code=304, headers=headers)
+    record_cache(f"{name}_etag", False)
+    if render is not None:
+        body = orjson.dumps(render())
+    return Response(body, media_type="application/json", headers=headers)
+
+def get_event_index():
+    data = cached_data["event_data"]["data"]
+    if event_index_cache["data"] is not data:
+        with span("build_event_index"):
+            index = EventIndex.from_events((data or {}).get("events") or [])
+        event_index_cache.update(data=data, index=index)
+    return event_index_cache["index"]
+
+def parse_query_date(value, end=False):
+    """ISO date or datetime; naive values are in EVENT_TIMEZONE, and an end date covers its whole day"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=EVENT_TIMEZONE)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def search_events(query, start, end, limit, offset):
+    total, records = get_event_index().search(query, start, end, limit, offset)
+    next_offset = offset + len(records)
+    return {
+        "events": [record.event for record in records],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "nextOffset": next_offset if next_offset < total else None,
+        "lastUpdated": cached_data["event_data"]["data"].get("lastUpdated")
+    }
 
 @app.get("/api/events")
-async def get_events():
+async def get_events(
+    request: Request,
+    query: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+):
+    """All cached events, or with any of query/start/end/limit/offset, one page of matches.
+
+    query matches words (and word prefixes) in the title, venue, address and description;
+    start/end select events overlapping that ISO date or datetime range.
+    """
     logger.info(f"Current events cache status - has data: {cached_data['event_data']['data'] is not None}")
     
     if cached_data["event_data"]["data"]:
-        logger.info("Returning cached events data")
-        return cached_data["event_data"]["data"]
+        if query is None and start is None and end is None and limit is None and not offset:
+            logger.info("Returning cached events data")
+            return cached_response(request, "event_data")
+
+        try:
+            start_at = parse_query_date(start) if start else None
+            end_at = parse_query_date(end, end=True) if end else None
+        except ValueError:
+            return {"error": "start and end must be ISO dates or datetimes"}
+        limit = max(1, min(limit or 20, EVENT_PAGE_MAX_LIMIT))
+        offset = max(0, offset)
+        variant = hashlib.sha256(repr((query, start, end, limit, offset)).encode("utf-8")).hexdigest()[:16]
+        return cached_response(
+            request,
+            "event_data",
+            variant,
+            lambda: search_events(query, start_at, end_at, limit, offset)
+        )
     
     logger.error("No events data available in cache")
     return {"error": "Failed to fetch events data"}
@@ -349,18 +1210,340 @@ async def get_events():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down scheduler...")
-    scheduler.shutdown() 
+    scheduler.shutdown()
+    if refresh_task is not None and not refresh_task.done():
+        refresh_task.cancel()
+    await email_jobs.stop()
+    await http_client.close()
+    leader_lock.release()
+    if parser_pool is not None:
+        parser_pool.shutdown(wait=False, cancel_futures=True)
 
 # Add this at the start of your FastAPI app
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up server...")
-    # Perform initial cache update
-    await update_cache()
-    logger.info("Initial cache update complete") 
+    # Serve the last snapshot right away and refresh in the background
+    load_snapshot()
+    await http_client.start()
+    email_jobs.start()
+    scheduler.start()
+    if LLM_PREWARM:
+        asyncio.get_event_loop().run_in_executor(None, warm_llm)
+    if leader_lock.acquire():
+        become_leader()
+    else:
+        become_follower()
+
+def hash_events(events):
+    """Content hash of a set of events, used to key the summary cache.
+
+    Built from the sorted per-event hashes, so it doesn't depend on list order or on
+    insights added after scraping (neither changes the summary prompt's content).
+    """
+    payload = "\n".join(sorted(hash_event(event) for event in events))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def format_event(e):
+    # Format events in a more readable way for the LLM
+    return (
+        f"Event: {e['eventTitle']}\n"
+        f"When: {e['eventDateTime']}\n"
+        f"Where: {e['location']}\n"
+        f"Description: {e['description'][:200]}..."  # Truncate long descriptions
+    )
+
+def format_events_summary(events):
+    return "\n\n".join(format_event(e) for e in events)
+
+# tiktoken downloads its encoding on first use. Until it has loaded, token counts are estimated,
+# and a failed load is retried after TOKENIZER_RETRY_INTERVAL
+TOKENIZER_LOAD_TIMEOUT = float(os.getenv('TOKENIZER_LOAD_TIMEOUT', 10))
+TOKENIZER_RETRY_INTERVAL = float(os.getenv('TOKENIZER_RETRY_INTERVAL', 5 * 60))
+tokenizer = None
+tokenizer_loading = None  # executor future for a load in progress
+tokenizer_retry_at = 0.0
+
+def load_tokenizer():
+    """The encoding gpt-3.5-turbo uses; blocks while tiktoken downloads it, so call it off the loop"""
+    global tokenizer
+    if tokenizer is None:
+        import tiktoken
+
+        tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    return tokenizer
+
+async def get_tokenizer():
+    """The tiktoken encoding, or None while it can't be loaded"""
+    global tokenizer_loading, tokenizer_retry_at
+    if tokenizer is not None or time.monotonic() < tokenizer_retry_at:
+        return tokenizer
+    loop = asyncio.get_running_loop()
+    if tokenizer_loading is None or tokenizer_loading.done() or tokenizer_loading.get_loop() is not loop:
+        tokenizer_loading = loop.run_in_executor(None, load_tokenizer)
+        # A load that outlives its waiter may still fail; that's already been logged as a timeout
+        tokenizer_loading.add_done_callback(lambda done: done.cancelled() or done.exception())
+    try:
+        return await asyncio.wait_for(asyncio.shield(tokenizer_loading), TOKENIZER_LOAD_TIMEOUT)
+    except Exception as e:
+        tokenizer_retry_at = time.monotonic() + TOKENIZER_RETRY_INTERVAL
+        logger.warning(f"Tokenizer unavailable, estimating token counts for {TOKENIZER_RETRY_INTERVAL:.0f}s: {e!r}")
+        return None
+
+def count_tokens(text, encoding):
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text))
+
+def chunk_events(events, encoding):
+    """Split formatted events into chunks that fit SUMMARY_CHUNK_TOKENS.
+
+    Events are ordered by content hash and a chunk also ends wherever an event's hash
+    hits a fixed residue, so adding or removing a few events only moves the boundaries
+    next to them and the other chunks stay cacheable.
+    """
+    blocks = sorted(
+        (hashlib.sha256(block.encode("utf-8")).hexdigest(), block)
+        for block in (format_event(e) for e in events)
+    )
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block_hash, block in blocks:
+        tokens = count_tokens(block, encoding)
+        if current and current_tokens + tokens > SUMMARY_CHUNK_TOKENS:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+        if int(block_hash, 16) % SUMMARY_CHUNK_EVENTS == 0:
+            chunks.append(current)
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def summarize_chunks(chunks):
+    semaphore = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
+
+    async def summarize(chunk):
+        events_summary = "\n\n".join(chunk)
+        key = hashlib.sha256(events_summary.encode("utf-8")).hexdigest()
+        summary = chunk_summary_cache.get(key)
+        record_cache("chunk_summary", summary is not None)
+        if summary is None:
+            async with semaphore:
+                summary = await run_chain("chunk_summary", events_summary=events_summary)
+            chunk_summary_cache.set(key, summary)
+        return summary
+
+    return await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+
+async def prepare_summary(events):
+    """Return the chain name and inputs for the final summary call.
+
+    Event sets that fit the token budget go straight to the "analysis" chain; larger ones are
+    summarised chunk by chunk first and merged by the "merge_summary" chain.
+    """
+    events_summary = format_events_summary(events)
+    encoding = await get_tokenizer()
+    # Tokenizing every event takes a while on large snapshots, so it runs on a thread
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, count_tokens, events_summary, encoding) <= SUMMARY_CHUNK_TOKENS:
+        return "analysis", {"events_summary": events_summary}
+
+    chunks = await loop.run_in_executor(None, chunk_events, events, encoding)
+    logger.info(f"Summarising {len(events)} events in {len(chunks)} chunks")
+    chunk_summaries = await summarize_chunks(chunks)
+    return "merge_summary", {"chunk_summaries": "\n\n---\n\n".join(chunk_summaries)}
+
+async def generate_events_summary(events):
+    chain_name, inputs = await prepare_summary(events)
+
+    # Add logging to debug the input
+    log_payload(f"Sending the following events to LLM:\n{next(iter(inputs.values()))}")
+
+    summary = await run_chain(chain_name, **inputs)
+
+    log_payload(f"Generated summary: {summary}")
+
+    return {
+        "summary": summary,
+        "lastUpdated": datetime.now().isoformat(),
+        "eventCount": len(events)
+    }
+
+def store_summary(key, data):
+    summary_cache["hash"] = key
+    summary_cache["data"] = data
+    summary_cache["expires_at"] = time.monotonic() + SUMMARY_CACHE_TTL
+
+async def generate_and_store_summary(key, events):
+    # Stored by the task itself, so the result is kept even if the caller that started it goes away
+    data = await generate_events_summary(events)
+    store_summary(key, data)
+    return data
+
+async def stream_and_store_summary(key, events, tokens):
+    """Like generate_and_store_summary, also putting each token on the `tokens` queue (None ends it)"""
+    try:
+        parts = []
+        chain_name, inputs = await prepare_summary(events)
+        async for token in stream_chain(chain_name, "Events summary", **inputs):
+            parts.append(token)
+            tokens.put_nowait(token)
+        data = {
+            "summary": "".join(parts),
+            "lastUpdated": datetime.now().isoformat(),
+            "eventCount": len(events)
+        }
+        store_summary(key, data)
+        return data
+    finally:
+        tokens.put_nowait(None)
+
+def inflight_summary(key):
+    task = summary_cache["inflight"].get(key)
+    # Tasks can only be awaited from the event loop that created them
+    if task is not None and task.get_loop() is asyncio.get_running_loop():
+        logger.info("Joining in-flight events summary generation")
+        return task
+    return None
+
+def start_summary(key, generate):
+    task = asyncio.get_running_loop().create_task(generate)
+    summary_cache["inflight"][key] = task
+    # Forget the task when it finishes, not when its first caller does
+    task.add_done_callback(
+        lambda done: summary_cache["inflight"].pop(key) if summary_cache["inflight"].get(key) is done else None
+    )
+    return task
+
+async def get_cached_summary(events):
+    """Return the summary for `events`, generating it at most once per snapshot.
+
+    Concurrent callers for the same snapshot share a single in-flight LLM call.
+    """
+    key = hash_events(events)
+
+    hit = summary_cache["hash"] == key and time.monotonic() < summary_cache["expires_at"]
+    record_cache("events_summary", hit)
+    if hit:
+        return summary_cache["data"]
+
+    task = inflight_summary(key) or start_summary(key, generate_and_store_summary(key, events))
+    return await asyncio.shield(task)
+
+def summary_during_refresh():
+    """The last complete summary, while a refresh is publishing partial event lists.
+
+    Summarising a half-crawled list would cost an LLM call for a result that's replaced
+    as soon as the crawl finishes.
+    """
+    if refresh_running and summary_cache["data"] is not None:
+        record_cache("events_summary", True)
+        return summary_cache["data"]
+    return None
+
+def sse_event(data, event=None):
+    """Format a single server-sent event"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_chain(chain_name, label, **inputs):
+    """Yield completion tokens from one of CHAIN_TEMPLATES' prompt and model as they are produced.
+
+    The whole completion must arrive within LLM_TIMEOUT, so a stream that trickles can't hold
+    an LLM slot indefinitely. Only the waits on the model count against it; the deadline isn't
+    an asyncio.timeout block, which would stay armed while the caller handles each token.
+    """
+    chain = await load_chain(chain_name)
+    async with get_llm_semaphore():
+        started = time.perf_counter()
+        deadline = started + LLM_TIMEOUT
+        first_token = True
+        chunks = (chain.prompt | chain.llm).astream(inputs)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.perf_counter()))
+                except StopAsyncIteration:
+                    break
+                if not chunk.content:
+                    continue
+                if first_token:
+                    elapsed = time.perf_counter() - started
+                    llm_first_token.observe(elapsed, stream=label)
+                    logger.info(f"{label} time to first token: {elapsed * 1000:.0f}ms")
+                    first_token = False
+                yield chunk.content
+        finally:
+            await chunks.aclose()
+
+async def stream_events_summary(events):
+    """Stream the events summary as SSE, serving the cached copy when one exists.
+
+    Only the request that starts a generation streams it token by token; requests that
+    arrive while one is running join it and get the finished summary as a single token.
+    """
+    key = hash_events(events)
+    try:
+        data = summary_during_refresh()
+        if data is None:
+            hit = summary_cache["hash"] == key and time.monotonic() < summary_cache["expires_at"]
+            record_cache("events_summary", hit)
+            if hit:
+                data = summary_cache["data"]
+        if data is None:
+            task = inflight_summary(key)
+            if task is not None:
+                data = await asyncio.shield(task)
+        if data is not None:
+            yield sse_event({"token": data["summary"]})
+            yield sse_event(data, event="done")
+            return
+
+        # Run as an in-flight task so other requests can join it, and it's stored even if this client leaves
+        tokens = asyncio.Queue()
+        task = start_summary(key, stream_and_store_summary(key, events, tokens))
+        while (token := await tokens.get()) is not None:
+            yield sse_event({"token": token})
+        yield sse_event(await asyncio.shield(task), event="done")
+
+    except Exception as e:
+        logger.error(f"Error streaming summary: {e}")
+        yield sse_event({"error": f"Failed to generate summary: {str(e)}"}, event="error")
+
+async def charge_client(request: Request):
+    """Take a rate limit token for a request that's about to reach the LLM; a 429 response if there's none"""
+    retry_after = await client_rate_limiter.check(client_key(request.scope, RATE_LIMIT_TRUSTED_PROXIES))
+    if not retry_after:
+        return None
+    record_rejection("rate_limited", request.url.path)
+    return JSONResponse(
+        rejection_payload("rate_limited"),
+        status_code=429,
+        headers={"Retry-After": str(math.ceil(retry_after))}
+    )
+
+def summary_needs_generating(events):
+    if refresh_running and summary_cache["data"] is not None:
+        return False
+    key = hash_events(events)
+    if summary_cache["hash"] == key and time.monotonic() < summary_cache["expires_at"]:
+        return False
+    return key not in summary_cache["inflight"]
 
 @app.get("/api/events-summary")
-async def get_events_summary():
+async def get_events_summary(request: Request, stream: bool = False):
     logger.info("Generating events summary...")
     
     # First check if we have event data
@@ -370,38 +1553,14 @@ async def get_events_summary():
     
     try:
         events = cached_data["event_data"]["data"]["events"]
-        
-        # Format events in a more readable way for the LLM
-        events_summary = "\n\n".join([
-            f"Event: {e['eventTitle']}\n"
-            f"When: {e['eventDateTime']}\n"
-            f"Where: {e['location']}\n"
-            f"Description: {e['description'][:200]}..."  # Truncate long descriptions
-            for e in events
-        ])
-        
-        # Add logging to debug the input
-        logger.info(f"Sending the following events to LLM:\n{events_summary}")
-        
-        # Run the analysis in a try-catch block
-        try:
-            summary = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: analysis_chain.run(events_summary=events_summary)
-            )
-            
-            logger.info(f"Generated summary: {summary}")
-            
-            return {
-                "summary": summary,
-                "lastUpdated": datetime.now().isoformat(),
-                "eventCount": len(events)
-            }
-            
-        except Exception as chain_error:
-            logger.error(f"Error in LLM chain: {chain_error}")
-            return {"error": f"Failed to generate summary: {str(chain_error)}"}
-            
+        if summary_needs_generating(events):
+            rejection = await charge_client(request)
+            if rejection is not None:
+                return rejection
+        if stream:
+            return sse_response(stream_events_summary(events))
+        return summary_during_refresh() or await get_cached_summary(events)
+
     except Exception as e:
         logger.error(f"Error generating summary: {e}")
         return {"error": f"Failed to generate summary: {str(e)}"}
@@ -428,27 +1587,111 @@ async def test_email():
         logger.error(f"Test email failed: {e}")
         return {"error": str(e)}
 
+def normalize_interests(form_data: EmailFormData):
+    """Canonical (hobbies, artist, movie), so equivalent submissions share one cached body"""
+    def clean(value):
+        return " ".join(value.lower().split())
+
+    hobbies = sorted({clean(h) for h in form_data.hobbies.split(",") if h.strip()})
+    return ", ".join(hobbies), clean(form_data.artist), clean(form_data.movie)
+
+async def generate_and_store_email_body(key, hobbies, artist, movie):
+    # Stored by the task itself, so it's cached even if every caller waiting on it is cancelled
+    body = await run_chain("email_body", hobbies=hobbies, artist=artist, movie=movie)
+    email_body_cache.set(key, body)
+    return body
+
+async def get_email_body(form_data: EmailFormData):
+    hobbies, artist, movie = normalize_interests(form_data)
+    key = json.dumps([hobbies, artist, movie])
+
+    body = email_body_cache.get(key)
+    record_cache("email_body", body is not None)
+    if body is not None:
+        return body
+
+    # Recipients with the same interests in one batch share a single LLM call
+    task = email_body_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(generate_and_store_email_body(key, hobbies, artist, movie))
+        email_body_inflight[key] = task
+        # Forget the task when it finishes, not when its first caller does
+        task.add_done_callback(
+            lambda done: email_body_inflight.pop(key) if email_body_inflight.get(key) is done else None
+        )
+    return await asyncio.shield(task)
+
+async def generate_email(form_data: EmailFormData):
+    if EMAIL_GENERATION_MODE == "templated":
+        body = await get_email_body(form_data)
+        return f"Hi {form_data.name},\n\n{body.strip()}\n\n{EMAIL_SIGN_OFF}"
+
+    return await run_chain(
+        "email",
+        name=form_data.name,
+        hobbies=form_data.hobbies,
+        artist=form_data.artist,
+        movie=form_data.movie
+    )
+
+def build_email(form_data: EmailFormData, message):
+    return {
+        "from": "onboarding@resend.dev",
+        "to": form_data.email,
+        "subject": f"A Special Message for {form_data.name}",
+        "text": message
+    }
+
+async def deliver_emails(emails):
+    """Send emails in provider-sized batches, rate limited to EMAIL_SEND_RATE calls per second"""
+    ids = []
+    batch_size = email_provider.max_batch_size
+    for start in range(0, len(emails), batch_size):
+        await email_send_limiter.wait()
+        with span("email_send"):
+            ids.extend(await email_provider.send_batch(emails[start:start + batch_size]))
+    return ids
+
+async def stream_send_email(form_data: EmailFormData):
+    """Stream the generated email as SSE, then deliver it once generation completes"""
+    try:
+        tokens = []
+        async for token in stream_chain(
+            "email",
+            "Email",
+            name=form_data.name,
+            hobbies=form_data.hobbies,
+            artist=form_data.artist,
+            movie=form_data.movie
+        ):
+            tokens.append(token)
+            yield sse_event({"token": token})
+
+        message = "".join(tokens)
+        await deliver_emails([build_email(form_data, message)])
+
+        logger.info(f"Email sent successfully to {form_data.email}")
+        yield sse_event({
+            "success": True,
+            "message": "Email sent successfully",
+            "generated_text": message
+        }, event="done")
+
+    except Exception as e:
+        logger.error(f"Error sending email: {e}")
+        yield sse_event({"success": False, "message": str(e)}, event="error")
+
 @app.post("/api/send-email")
-async def send_email(form_data: EmailFormData):
+async def send_email(form_data: EmailFormData, stream: bool = False):
+    if stream:
+        return sse_response(stream_send_email(form_data))
+
     try:
         # Generate personalized message using OpenAI
-        message = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: email_chain.run(
-                name=form_data.name,
-                hobbies=form_data.hobbies,
-                artist=form_data.artist,
-                movie=form_data.movie
-            )
-        )
+        message = await generate_email(form_data)
         
-        # Send email using Resend
-        response = resend.Emails.send({
-            "from": "onboarding@resend.dev",
-            "to": form_data.email,
-            "subject": f"A Special Message for {form_data.name}",
-            "text": message
-        })
+        # Send email through the configured provider
+        await deliver_emails([build_email(form_data, message)])
         
         logger.info(f"Email sent successfully to {form_data.email}")
         return {
@@ -461,44 +1704,146 @@ async def send_email(form_data: EmailFormData):
         logger.error(f"Error sending email: {e}")
         return {"success": False, "message": str(e)}
 
+class BulkEmailRequest(BaseModel):
+    recipients: List[EmailFormData]
+
+async def process_email_job(job):
+    """Generate each batch of recipients concurrently, then deliver the batch in one provider call"""
+    recipients = job["payload"]
+    job.update(total=len(recipients), sent=0, failed=0, results=[])
+
+    for start in range(0, len(recipients), EMAIL_BATCH_SIZE):
+        batch = recipients[start:start + EMAIL_BATCH_SIZE]
+        messages = await asyncio.gather(*(generate_email(r) for r in batch), return_exceptions=True)
+
+        ready = []
+        for recipient, message in zip(batch, messages):
+            if isinstance(message, Exception):
+                job["failed"] += 1
+                job["results"].append({"email": recipient.email, "status": "failed", "error": str(message)})
+            else:
+                ready.append((recipient, message))
+
+        if not ready:
+            continue
+        try:
+            ids = await deliver_emails([build_email(recipient, message) for recipient, message in ready])
+            for (recipient, _), email_id in zip(ready, ids):
+                job["sent"] += 1
+                job["results"].append({"email": recipient.email, "status": "sent", "id": email_id})
+        except Exception as e:
+            logger.error(f"Error delivering email batch for job {job['id']}: {e}")
+            for recipient, _ in ready:
+                job["failed"] += 1
+                job["results"].append({"email": recipient.email, "status": "failed", "error": str(e)})
+
+    logger.info(f"Email job {job['id']} finished: {job['sent']} sent, {job['failed']} failed")
+
+email_jobs = JobQueue(process_email_job, workers=EMAIL_WORKERS)
+
+def job_status(job):
+    return {key: value for key, value in job.items() if key != "payload"}
+
+@app.post("/api/send-email/bulk")
+async def send_bulk_email(bulk_request: BulkEmailRequest):
+    if len(bulk_request.recipients) > EMAIL_BULK_MAX:
+        return JSONResponse(
+            {"error": f"Too many recipients: at most {EMAIL_BULK_MAX} per request"},
+            status_code=413
+        )
+    job = email_jobs.submit(bulk_request.recipients)
+    logger.info(f"Queued email job {job['id']} for {len(bulk_request.recipients)} recipients")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": len(bulk_request.recipients)
+    }
+
+@app.get("/api/send-email/jobs/{job_id}")
+async def get_email_job(job_id: str):
+    job = email_jobs.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    return job_status(job)
+
 # Add session middleware
 app.add_middleware(
     SessionMiddleware,
     secret_key=os.getenv('SESSION_SECRET_KEY', 'your-secret-key')  # Change this!
 )
 
-# Configure OAuth
-oauth = OAuth()
-oauth.register(
-    "auth0",
-    client_id=os.getenv('AUTH0_CLIENT_ID'),
-    client_secret=os.getenv('AUTH0_CLIENT_SECRET'),
-    client_kwargs={
-        "scope": "openid profile email",  # Basic OpenID scopes
-    },
-    server_metadata_url=f'https://{os.getenv("AUTH0_DOMAIN")}/.well-known/openid-configuration'
-)
+# Configure OAuth, on the first login rather than at import (authlib is slow to import)
+oauth = None
+
+def get_oauth():
+    global oauth
+    if oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+
+        oauth = OAuth()
+        oauth.register(
+            "auth0",
+            client_id=os.getenv('AUTH0_CLIENT_ID'),
+            client_secret=os.getenv('AUTH0_CLIENT_SECRET'),
+            client_kwargs={
+                "scope": "openid profile email",  # Basic OpenID scopes
+            },
+            server_metadata_url=f'https://{os.getenv("AUTH0_DOMAIN")}/.well-known/openid-configuration'
+        )
+    return oauth
 
 # LinkedIn API endpoints
+# LinkedIn profiles, cached per access token until expiry or logout
+LINKEDIN_PROFILE_CACHE_TTL = int(os.getenv('LINKEDIN_PROFILE_CACHE_TTL', 15 * 60))
+linkedin_profile_cache = TTLCache(max_entries=1024, ttl=LINKEDIN_PROFILE_CACHE_TTL)
+
+def linkedin_cache_key(user):
+    linkedin_token = (user or {}).get('https://api.linkedin.com/access_token')
+    return hashlib.sha256(linkedin_token.encode("utf-8")).hexdigest() if linkedin_token else None
+
+async def fetch_linkedin_profile(linkedin_token):
+    headers = {
+        'Authorization': f'Bearer {linkedin_token}',
+        'Accept': 'application/json',
+    }
+
+    # Profile, positions and education are independent, so fetch them in one round trip
+    profile_response, positions_response, education_response = await asyncio.gather(
+        http_client.get(f'{LINKEDIN_API_URL}/v2/me', headers=headers),
+        http_client.get(f'{LINKEDIN_API_URL}/v2/positions', headers=headers, params={'q': 'member'}),
+        http_client.get(f'{LINKEDIN_API_URL}/v2/educations', headers=headers, params={'q': 'member'})
+    )
+
+    profile = {
+        "profile": profile_response.json(),
+        "positions": positions_response.json(),
+        "education": education_response.json()
+    }
+    ok = all(r.status == 200 for r in (profile_response, positions_response, education_response))
+    return profile, ok
+
 @app.get("/api/auth/login")
-async def auth_login(request):
+async def auth_login(request: Request):
     redirect_uri = request.url_for('auth_callback')
-    return await oauth.auth0.authorize_redirect(request, redirect_uri)
+    return await get_oauth().auth0.authorize_redirect(request, redirect_uri)
 
 @app.get("/api/auth/callback")
-async def auth_callback(request):
-    token = await oauth.auth0.authorize_access_token(request)
-    user = await oauth.auth0.parse_id_token(request, token)
+async def auth_callback(request: Request):
+    token = await get_oauth().auth0.authorize_access_token(request)
+    user = await get_oauth().auth0.parse_id_token(request, token)
     request.session['user'] = dict(user)
     return {"success": True, "user": user}
 
 @app.get("/api/auth/logout")
-async def auth_logout(request):
+async def auth_logout(request: Request):
+    key = linkedin_cache_key(request.session.get('user'))
+    if key:
+        linkedin_profile_cache.pop(key)
     request.session.pop('user', None)
     return {"success": True}
 
 @app.get("/api/linkedin/profile")
-async def get_linkedin_profile(request):
+async def get_linkedin_profile(request: Request):
     try:
         # Get access token from session
         user = request.session.get('user')
@@ -510,79 +1855,62 @@ async def get_linkedin_profile(request):
         if not linkedin_token:
             return {"error": "No LinkedIn access token"}
 
-        # Make request to LinkedIn API
-        headers = {
-            'Authorization': f'Bearer {linkedin_token}',
-            'Accept': 'application/json',
-        }
-        
-        # Get basic profile
-        profile_response = requests.get(
-            'https://api.linkedin.com/v2/me',
-            headers=headers
-        )
-        
-        # Get positions
-        positions_response = requests.get(
-            'https://api.linkedin.com/v2/positions',
-            headers=headers,
-            params={'q': 'member'}
-        )
-        
-        # Get education
-        education_response = requests.get(
-            'https://api.linkedin.com/v2/educations',
-            headers=headers,
-            params={'q': 'member'}
-        )
+        key = linkedin_cache_key(user)
+        profile = linkedin_profile_cache.get(key)
+        record_cache("linkedin_profile", profile is not None)
+        if profile is not None:
+            return profile
 
-        return {
-            "profile": profile_response.json(),
-            "positions": positions_response.json(),
-            "education": education_response.json()
-        }
+        profile, ok = await fetch_linkedin_profile(linkedin_token)
+        # Only cache complete profiles, so a failed call is retried next time
+        if ok:
+            linkedin_profile_cache.set(key, profile)
+        return profile
 
     except Exception as e:
         logger.error(f"Error fetching LinkedIn profile: {e}")
         return {"error": str(e)}
 
+async def stream_linkedin_email(profile_data: dict):
+    try:
+        tokens = []
+        async for token in stream_chain(
+            "linkedin",
+            "LinkedIn email",
+            name=profile_data.get('name'),
+            current_position=profile_data.get('current_position'),
+            company=profile_data.get('company'),
+            experience=profile_data.get('experience'),
+            education=profile_data.get('education')
+        ):
+            tokens.append(token)
+            yield sse_event({"token": token})
+
+        yield sse_event({"success": True, "generated_text": "".join(tokens)}, event="done")
+
+    except Exception as e:
+        logger.error(f"Error generating LinkedIn email: {e}")
+        yield sse_event({"error": str(e)}, event="error")
+
 # Add this to your existing email generation endpoint
 @app.post("/api/generate-linkedin-email")
 async def generate_linkedin_email(
     request: Request,
-    profile_data: dict
+    profile_data: dict,
+    stream: bool = False
 ):
-    try:
-        # Create a prompt template for LinkedIn data
-        linkedin_prompt = ChatPromptTemplate.from_template("""
-        You are writing a personalized email based on someone's LinkedIn profile.
-
-        Profile Information:
-        Name: {name}
-        Current Position: {current_position}
-        Company: {company}
-        Experience: {experience}
-        Education: {education}
-
-        Write an engaging email that:
-        1. Acknowledges their professional background
-        2. Makes interesting connections between their experiences
-        3. Suggests potential career opportunities or growth areas
-        4. Ends with a professional call to action
-
-        Keep the tone professional but friendly.
-        """)
+    if stream:
+        return sse_response(stream_linkedin_email(profile_data))
 
+    try:
         # Generate the email content
-        message = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: analysis_chain.run(
-                name=profile_data.get('name'),
-                current_position=profile_data.get('current_position'),
-                company=profile_data.get('company'),
-                experience=profile_data.get('experience'),
-                education=profile_data.get('education')
-            )
+        message = await run_chain(
+            "linkedin",
+            name=profile_data.get('name'),
+            current_position=profile_data.get('current_position'),
+            company=profile_data.get('company'),
+            experience=profile_data.get('experience'),
+            education=profile_data.get('education')
         )
 
         return {
@@ -592,4 +1920,4 @@ async def generate_linkedin_email(
 
     except Exception as e:
         logger.error(f"Error generating LinkedIn email: {e}")
-        return {"error": str(e)} 
\ No newline at end of file
+        return {"error": str(e)}
@@ -0,0 +1,130 @@
+"""Minimal Prometheus-style metrics: counters, gauges, histograms and timing spans.
+
+Metrics are kept per process and rendered in the Prometheus text exposition format.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state):
+                    samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), state[-1]))
+                samples.append((f"{self.name}_sum", key, state[-2]))
+                samples.append((f"{self.name}_count", key, state[-1]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation):
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        return self._register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+span_duration = registry.histogram("replance_span_duration_seconds", "Duration of instrumented hot-path spans")
+span_errors = registry.counter("replance_span_errors_total", "Spans that exited with an exception")
+
+
+@contextmanager
+def span(name, **labels):
+    """Time a block into replance_span_duration_seconds, counting exceptions as errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        span_errors.inc(span=name, **labels)
+        raise
+    finally:
+        span_duration.observe(time.perf_counter() - started, span=name, **labels)
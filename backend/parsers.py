@@ -0,0 +1,106 @@
+"""HTML extraction for the Eventbrite and Yahoo Finance scrapers.
+
+Kept free of app imports so the functions can run in worker processes. Each page is
+parsed with a SoupStrainer that keeps only the subtrees we read from, and the parser
+backend is picked with HTML_PARSER ("html.parser", "lxml" or "auto").
+"""
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _resolve_backend(name):
+    if name == "auto":
+        try:
+            import lxml  # noqa: F401
+            return "lxml"
+        except ImportError:
+            return "html.parser"
+    return name
+
+
+HTML_PARSER = _resolve_backend(os.getenv('HTML_PARSER', 'html.parser'))
+
+
+def _classes(attrs):
+    value = attrs.get('class') or ''
+    return value.split() if isinstance(value, str) else list(value)
+
+
+def _is_event_node(name, attrs):
+    classes = _classes(attrs)
+    if name == 'h1':
+        return 'event-title' in classes
+    if name == 'span':
+        return 'date-info__full-datetime' in classes
+    if name == 'div':
+        return 'location-info__address' in classes or 'event-description__content' in classes
+    return False
+
+
+def _is_event_link(name, attrs):
+    return name == 'a' and 'href' in attrs and 'event-card-link' in _classes(attrs)
+
+
+def _is_quote_field(name, attrs):
+    return name == 'fin-streamer' and 'data-field' in attrs
+
+
+EVENT_STRAINER = SoupStrainer(_is_event_node)
+LISTING_STRAINER = SoupStrainer(_is_event_link)
+QUOTE_STRAINER = SoupStrainer(_is_quote_field)
+
+
+def parse_event_page(content):
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=EVENT_STRAINER)
+
+    event_title = soup.find('h1', class_='event-title css-0')
+    event_title = event_title.text.strip() if event_title else None
+
+    event_date_time = soup.find('span', class_='date-info__full-datetime')
+    event_date_time = event_date_time.text.strip() if event_date_time else None
+
+    location_info_tag = soup.find('div', class_='location-info__address')
+    location_name = None
+    address = None
+    if location_info_tag:
+        location_name_tag = location_info_tag.find('p', class_='location-info__address-text')
+        location_name = location_name_tag.get_text(strip=True) if location_name_tag else None
+
+        address_parts = location_info_tag.contents
+        address_text = ''
+        for part in address_parts:
+            if isinstance(part, str):
+                address_text += part.strip() + " "
+        address = address_text.replace(location_name, "").strip() if location_name else address_text.strip()
+
+    description_tag = soup.find('div', class_='event-description__content')
+    description = description_tag.get_text(separator=" ", strip=True)[:300] if description_tag else "Description not found."
+
+    return {
+        'eventTitle': event_title,
+        'eventDateTime': event_date_time,
+        'location': location_name,
+        'address': address,
+        'description': description
+    }
+
+
+def parse_listing_page(content):
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=LISTING_STRAINER)
+    event_links = soup.find_all('a', class_='event-card-link', href=True)
+    return [event_link['href'] for event_link in event_links]
+
+
+def parse_stock_page(content):
+    soup = BeautifulSoup(content, HTML_PARSER, parse_only=QUOTE_STRAINER)
+
+    previous_close = soup.find('fin-streamer', {'data-field': 'regularMarketPreviousClose'})
+    market_open = soup.find('fin-streamer', {'data-field': 'regularMarketOpen'})
+
+    if previous_close and market_open:
+        return {
+            "previousClose": previous_close.text,
+            "marketOpen": market_open.text
+        }
+    return None
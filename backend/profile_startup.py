@@ -0,0 +1,115 @@
+"""Startup profile for the backend.
+
+Reports the slowest imports of `main` (from `python -X importtime`) and the time from
+launching uvicorn until `/` answers, so regressions in cold-start time are easy to spot.
+
+    python profile_startup.py --top 20 --output startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def startup_env(workdir):
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-profile")
+    # Keep the run from scraping real sites, calling OpenAI or touching the real caches
+    env.update({
+        "REFRESH_INTERVAL_MINUTES": "0",
+        "LLM_PREWARM": "false",
+        "EVENTBRITE_URL": "http://127.0.0.1:9",
+        "YAHOO_FINANCE_URL": "http://127.0.0.1:9",
+        "SNAPSHOT_PATH": os.path.join(workdir, "snapshot.json.gz"),
+        "LEADER_LOCK_PATH": os.path.join(workdir, "leader.lock"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db")
+    })
+    return env
+
+
+def profile_imports(env, top):
+    """Parse -X importtime output into the `top` imports by cumulative and by self time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2)
+        })
+
+    main_entry = next((m for m in modules if m["module"] == "main"), None)
+    return {
+        "total_ms": main_entry["cumulative_ms"] if main_entry else None,
+        "by_cumulative": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+        "by_self": sorted(modules, key=lambda m: m["self_ms"], reverse=True)[:top]
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(env, timeout):
+    """Seconds from spawning uvicorn until GET / returns 200"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return round(time.perf_counter() - started, 3)
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/ was not healthy after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="uvicorn cold starts to time")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for / to come up")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = startup_env(tempfile.mkdtemp(prefix="replance-startup-"))
+    runs = [time_to_healthy(env, args.timeout) for _ in range(args.runs)]
+    report = {
+        "imports": profile_imports(env, args.top),
+        "time_to_healthy_s": {"runs": runs, "min": min(runs), "max": max(runs)}
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
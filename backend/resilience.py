@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after `failure_threshold` consecutive failures.
+
+    Once `reset_timeout` seconds have passed, one probe call is let through: success
+    closes the circuit, failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_timeout:
+            # Other callers keep failing fast until the probe reports back (or times out)
+            self.state = "half_open"
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+async def hedged(make_call, delay):
+    """Await make_call(), starting a second identical call if the first takes longer than `delay`.
+
+    Returns the first successful result and cancels the other call. Only use this for
+    idempotent requests.
+    """
+    tasks = {asyncio.ensure_future(make_call())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        tasks.add(asyncio.ensure_future(make_call()))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,45 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Persists cache snapshots as gzipped JSON so new workers can start warm.
+
+    Writes go to a temp file in the same directory and are moved into place with
+    os.replace, so readers only ever see a complete snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load snapshot from {self.path}: {e}")
+            return None
+
+    def mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def save(self, snapshot):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(snapshot, separators=(",", ":"), default=str).encode("utf-8"))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
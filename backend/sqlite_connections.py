@@ -0,0 +1,25 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnections:
+    """One WAL-mode sqlite3 connection per thread for a database file.
+
+    sqlite3 connections can't be shared across threads, and every call here may run on
+    any executor thread, so each thread opens its own on first use and keeps it.
+    WAL mode lets several workers read while one writes to the same file.
+    """
+
+    def __init__(self, database_path, **connect_kwargs):
+        self.database_path = database_path
+        self.connect_kwargs = connect_kwargs
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_path, **self.connect_kwargs)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, client_key
+
+
+def scope(*forwarded, peer="10.0.0.1"):
+    return {
+        "headers": [(b"x-forwarded-for", value.encode("latin-1")) for value in forwarded],
+        "client": (peer, 443)
+    }
+
+
+def test_client_key_uses_peer_without_trusted_proxies():
+    assert client_key(scope("1.1.1.1")) == "10.0.0.1"
+
+
+def test_client_key_takes_entry_added_by_trusted_proxy():
+    assert client_key(scope("2.2.2.2"), trusted_proxies=1) == "2.2.2.2"
+    assert client_key(scope("2.2.2.2, 3.3.3.3"), trusted_proxies=2) == "2.2.2.2"
+
+
+def test_client_key_ignores_spoofed_left_entries():
+    assert client_key(scope("6.6.6.6, 2.2.2.2"), trusted_proxies=1) == "2.2.2.2"
+    assert client_key(scope("6.6.6.6", "7.7.7.7, 2.2.2.2"), trusted_proxies=1) == "2.2.2.2"
+    assert client_key(scope("6.6.6.6, 2.2.2.2, 3.3.3.3"), trusted_proxies=2) == "2.2.2.2"
+
+
+def test_client_key_with_fewer_entries_than_proxies():
+    assert client_key(scope("2.2.2.2"), trusted_proxies=3) == "2.2.2.2"
+
+
+def test_client_key_falls_back_to_peer_without_header():
+    assert client_key(scope(), trusted_proxies=1) == "10.0.0.1"
+    assert client_key({"headers": []}, trusted_proxies=1) == "unknown"
+
+
+def test_admission_rejects_when_queue_is_full():
+    async def run():
+        admission = AdmissionController(max_active=1, max_queued=1, queue_timeout=5)
+        await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.reason == "queue_full"
+
+        admission.release()
+        await waiting
+        assert (admission.active, admission.queued) == (1, 0)
+
+    asyncio.run(run())
+
+
+def test_admission_rejects_after_queue_timeout():
+    async def run():
+        admission = AdmissionController(max_active=1, max_queued=1, queue_timeout=0.01)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        assert rejected.value.reason == "queue_timeout"
+        assert (admission.active, admission.queued) == (1, 0)
+
+    asyncio.run(run())
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+import orjson
+import pytest
+
+import main
+from event_index import normalize_event
+from ttl_cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setitem(main.cached_data, "event_data", {
+        "data": None, "last_updated": None, "body": None, "etag": None, "refresh_error": None, "partial": False
+    })
+    monkeypatch.setattr(main, "event_insights_cache", TTLCache(max_entries=100, ttl=60))
+    monkeypatch.setattr(main, "EVENT_INSIGHTS", True)
+
+    async def get_cached_summary(events):
+        return None
+    monkeypatch.setattr(main, "get_cached_summary", get_cached_summary)
+
+
+def make_events(count):
+    return [
+        normalize_event({"eventTitle": f"Jazz Night {i}", "eventDateTime": f"November {i + 1}, 2026 · 7 - 10pm PST"}, url=f"/e/{i}")
+        for i in range(count)
+    ]
+
+
+def stub_scrape(monkeypatch, events, polls):
+    # Like the real crawl, every refresh hands back the same scraped dicts
+    async def scrape_events(on_event=None):
+        on_event(events)
+        polls.append(main.cached_body("event_data"))
+        return {"events": events, "lastUpdated": "now"}
+    monkeypatch.setattr(main, "scrape_events", scrape_events)
+
+
+def stub_insights(monkeypatch, reply):
+    async def generate_insights_batch(batch):
+        # A client polling while insights are generated
+        main.cached_body("event_data")
+        return reply(batch)
+    monkeypatch.setattr(main, "generate_insights_batch", generate_insights_batch)
+
+
+def served_events():
+    body, _ = main.cached_body("event_data")
+    return orjson.loads(body)["events"]
+
+
+def test_cold_refresh_serves_insights_read_mid_refresh(monkeypatch):
+    polls = []
+    stub_scrape(monkeypatch, make_events(6), polls)
+    stub_insights(monkeypatch, lambda batch: [f"About {e['eventTitle']}" for e in batch])
+
+    asyncio.run(main.update_event_cache())
+
+    assert [e.get("aiInsights") for e in served_events()] == [f"About Jazz Night {i}" for i in range(6)]
+
+
+def test_unchanged_refresh_keeps_body_and_etag(monkeypatch):
+    polls = []
+    stub_scrape(monkeypatch, make_events(6), polls)
+    stub_insights(monkeypatch, lambda batch: [f"About {e['eventTitle']}" for e in batch])
+
+    asyncio.run(main.update_event_cache())
+    body, etag = main.cached_body("event_data")
+    asyncio.run(main.update_event_cache())
+
+    assert main.cached_body("event_data") == (body, etag)
+    # Mid-crawl, clients kept getting the events with their insights
+    assert polls[1] == (body, etag)
+
+
+def test_retried_insights_replace_failures(monkeypatch):
+    polls = []
+    stub_scrape(monkeypatch, make_events(3), polls)
+
+    def fail(batch):
+        raise RuntimeError("LLM unavailable")
+    stub_insights(monkeypatch, fail)
+    asyncio.run(main.update_event_cache())
+    assert {e["aiInsights"] for e in served_events()} == {"Unable to generate insights"}
+
+    stub_insights(monkeypatch, lambda batch: [f"About {e['eventTitle']}" for e in batch])
+    asyncio.run(main.update_event_cache())
+    assert [e["aiInsights"] for e in served_events()] == [f"About Jazz Night {i}" for i in range(3)]
+
+
+def test_partial_snapshot_is_served_as_stale(monkeypatch):
+    main.set_cached("event_data", {"events": make_events(2)}, last_updated=datetime.now() - timedelta(hours=1))
+    seen = []
+
+    async def scrape_events(on_event=None):
+        events = make_events(4)
+        on_event(events[:3])
+        seen.append((main.is_stale("event_data"), main.data_age("event_data"), main.cache_control(stale=True)))
+        return {"events": events, "lastUpdated": "now"}
+    monkeypatch.setattr(main, "scrape_events", scrape_events)
+    stub_insights(monkeypatch, lambda batch: ["About it"] * len(batch))
+
+    asyncio.run(main.update_event_cache())
+
+    stale, age, cache_control = seen[0]
+    assert stale and age >= 3600 and cache_control == "no-cache"
+    assert not main.is_stale("event_data")
+    assert len(served_events()) == 4
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from event_index import EVENT_TIMEZONE, EventIndex
+
+def make_index(count=10):
+    events = [
+        {
+            'eventTitle': f"Jazz Night {i}" if i % 2 else f"Art Walk {i}",
+            'eventDateTime': f"November {i + 1}, 2026 · 7 - 10pm PST",
+            'location': f"Venue {i}",
+            'address': f"{i} Market St San Francisco, CA 94103",
+            'description': "An evening in the city"
+        }
+        for i in range(count)
+    ]
+    return EventIndex.from_events(events)
+
+
+def dt(day, hour=0):
+    return datetime(2026, 11, day, hour, tzinfo=EVENT_TIMEZONE)
+
+
+def test_stopword_only_query_does_not_filter():
+    index = make_index()
+    for query in ("the", "!!!", "the and of"):
+        total, records = index.search(query=query)
+        assert total == 10
+        assert len(records) == 10
+
+
+def test_query_matches_word_prefixes():
+    total, records = make_index().search(query="jazz nigh")
+    assert total == 5
+    assert all(r.title.startswith("Jazz Night") for r in records)
+
+
+def test_date_range_only():
+    total, records = make_index().search(start=dt(3), end=dt(5))
+    assert total == 2
+    assert [r.starts_at.day for r in records] == [3, 4]
+
+
+def test_date_range_includes_events_still_running():
+    # November 2's event runs 7-10pm, so it overlaps a range starting at 9pm
+    total, records = make_index().search(start=dt(2, 21), end=dt(3))
+    assert [r.starts_at.day for r in records] == [2]
+
+
+def test_pagination_is_chronological():
+    index = make_index()
+    total, first = index.search(limit=4, offset=0)
+    _, second = index.search(limit=4, offset=4)
+    _, last = index.search(limit=4, offset=8)
+    assert total == 10
+    days = [r.starts_at.day for r in first + second + last]
+    assert days == list(range(1, 11))
+    assert len(last) == 2
+
+
+def test_query_and_range_combined():
+    total, records = make_index().search(query="art", start=dt(1), end=dt(6))
+    assert [r.title for r in records] == ["Art Walk 0", "Art Walk 2", "Art Walk 4"]
+    assert total == 3